@@ -0,0 +1,263 @@
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Optional
+
+from cache import TTLCache
+
+# --- Admission control: per-user rate limits and fair queuing ---
+
+
+class Rejected(Exception):
+    """A request was not admitted; ``status`` is 429 (this user) or 503 (overall load)."""
+
+    def __init__(self, message: str, status: int, retry_after: float):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class MemoryBuckets:
+    """
+    Token buckets in this process: ``rate`` tokens per second per key, up to
+    ``burst``. A bucket idle long enough to refill is dropped, which is the
+    same as keeping it full.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = TTLCache(maxsize=max_keys, ttl=burst / rate)
+
+    async def take(self, key: str) -> float:
+        """Spend one token: 0 if there was one, else seconds until there will be."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        self._buckets.set(key, (tokens - 1, now))
+        return 0.0
+
+
+class SQLiteBuckets:
+    """
+    Token buckets in a WAL-mode SQLite file, so every uvicorn worker on the
+    host enforces one shared limit per user. Updates run on a dedicated thread.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limit")
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    async def take(self, key: str) -> float:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._take, key)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _take(self, key: str) -> float:
+        conn = self._connect()
+        # Wall-clock time, since the buckets are shared between processes
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = self.burst if row is None else min(self.burst, row[0] + max(0.0, now - row[1]) * self.rate)
+            if tokens < 1:
+                return (1 - tokens) / self.rate
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens - 1, now),
+            )
+            return 0.0
+
+
+class _Waiter:
+    __slots__ = ("future", "weight")
+
+    def __init__(self, future: asyncio.Future, weight: float):
+        self.future = future
+        self.weight = weight
+
+
+class Admission:
+    """
+    Admission control for expensive requests, keyed by user.
+
+    Each user's requests first pass a token bucket (429 when empty). At most
+    ``limit`` admitted requests run at once; the rest wait in a bounded queue
+    and are dequeued by start-time fair queuing, so every waiting user gets
+    slots in proportion to its ``weight`` however many requests it queued.
+    The queue sheds load with 503 once full or after ``max_wait`` seconds,
+    and one user may hold at most ``max_queue_per_user`` waiting requests.
+
+    ``limit`` adapts (AIMD) between ``min_active`` and ``max_active``: it
+    shrinks while ``overloaded()`` reports the upstream saturated, so
+    requests wait here in fair order instead of in the upstream's FIFO queue,
+    and grows back by about one per ``limit`` completions otherwise.
+
+    Every Retry-After is an estimate from the recent hold time per request.
+    """
+
+    def __init__(
+        self,
+        max_active: int = 32,
+        min_active: int = 4,
+        max_queue: int = 256,
+        max_queue_per_user: int = 4,
+        max_wait: float = 10.0,
+        buckets=None,
+        overloaded: Optional[Callable[[], bool]] = None,
+        decrease_interval: float = 1.0,
+    ):
+        self.max_active = max_active
+        self.min_active = min_active
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.max_wait = max_wait
+        self.buckets = buckets
+        self.overloaded = overloaded
+        self.decrease_interval = decrease_interval
+        self.limit = float(max_active)
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.hold_time = 1.0
+        self._waiting: Dict[str, Deque[_Waiter]] = {}
+        # Start-time fair queuing: each user's next virtual start, and the
+        # virtual time of the request admitted last
+        self._finish: Dict[str, float] = {}
+        self._clock = 0.0
+        self._decreased_at = 0.0
+
+    @asynccontextmanager
+    async def admit(self, key: str, weight: float = 1.0):
+        """Hold an admission slot for the block (raises Rejected if not admitted)."""
+        await self.acquire(key, weight)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    async def acquire(self, key: str, weight: float = 1.0) -> None:
+        if self.buckets is not None:
+            wait = await self.buckets.take(key)
+            if wait > 0:
+                self.rate_limited += 1
+                raise Rejected("Rate limit exceeded", 429, wait)
+
+        if self.active < int(self.limit) and not self.queued:
+            self._start(key, weight)
+            return
+
+        waiting = self._waiting.get(key)
+        if waiting is not None and len(waiting) >= self.max_queue_per_user:
+            self.rate_limited += 1
+            raise Rejected("Too many requests waiting for this user", 429, self._retry_after(len(waiting)))
+        if self.queued >= self.max_queue:
+            self.shed += 1
+            raise Rejected("Server is busy", 503, self._retry_after(self.queued))
+
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), weight)
+        self._waiting.setdefault(key, deque()).append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as we gave up: hand the slot back
+                self.release(0.0)
+            else:
+                waiter.future.cancel()
+                self._remove(key, waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed += 1
+            raise Rejected("Server is busy", 503, self._retry_after(self.queued)) from None
+
+    def release(self, held: float) -> None:
+        self.active -= 1
+        if held:
+            self.hold_time += 0.1 * (held - self.hold_time)
+        now = time.monotonic()
+        if self.overloaded is not None and self.overloaded():
+            if now - self._decreased_at >= self.decrease_interval:
+                self.limit = max(self.min_active, self.limit * 0.75)
+                self._decreased_at = now
+        else:
+            self.limit = min(self.max_active, self.limit + 1 / self.limit)
+        self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 1),
+            "active": self.active,
+            "queued": self.queued,
+            "waiting_users": len(self._waiting),
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+        }
+
+    def _start(self, key: str, weight: float) -> None:
+        start = max(self._finish.get(key, 0.0), self._clock)
+        self._clock = start
+        self._finish[key] = start + 1 / weight
+        self.active += 1
+        self.admitted += 1
+
+    def _dispatch(self) -> None:
+        while self.active < int(self.limit) and self._waiting:
+            # The waiting user with the earliest virtual start goes next
+            key = min(self._waiting, key=lambda k: max(self._finish.get(k, 0.0), self._clock))
+            waiting = self._waiting[key]
+            waiter = waiting.popleft()
+            if not waiting:
+                del self._waiting[key]
+            self.queued -= 1
+            self._start(key, waiter.weight)
+            waiter.future.set_result(None)
+        # Users behind the clock would restart at the clock anyway
+        if len(self._finish) > 1024:
+            self._finish = {k: v for k, v in self._finish.items() if v > self._clock}
+
+    def _remove(self, key: str, waiter: _Waiter) -> None:
+        waiting = self._waiting.get(key)
+        if waiting is not None and waiter in waiting:
+            waiting.remove(waiter)
+            self.queued -= 1
+            if not waiting:
+                del self._waiting[key]
+
+    def _retry_after(self, ahead: int) -> float:
+        return self.hold_time * (ahead + 1) / max(1, int(self.limit))
@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from resilience import Upstream, UpstreamUnavailable, clear_deadline
+
+# --- Content-addressed TTS audio cache ---
+
+CHUNK_SIZE = 64 * 1024
+# A partial file older than this was left by a crashed writer, not one still synthesizing
+STALE_PART_SECONDS = 600
+
+
+class AudioCache:
+    """
+    Size-bounded LRU of synthesized speech on local disk, keyed by
+    sha256(text, voice, model).
+
+    ``request`` returns the key immediately and synthesizes in the background
+    on ``executor``; concurrent requests for the same key share one synthesis.
+    With an ``upstream`` guard, synthesis runs under its limits and uncached
+    text is refused up front while its circuit is open.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        synthesize: Callable[[str, str, str], Iterable[bytes]],
+        executor: Executor,
+        max_bytes: int = 512 * 1024 * 1024,
+        upstream: Optional[Upstream] = None,
+    ):
+        self.directory = directory
+        self.synthesize = synthesize
+        self.executor = executor
+        self.max_bytes = max_bytes
+        self.upstream = upstream
+        self.hits = 0
+        self.misses = 0
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, asyncio.Task] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(text: str, voice: str, model: str) -> str:
+        return hashlib.sha256(json.dumps([text, voice, model]).encode()).hexdigest()
+
+    def path(self, audio_hash: str) -> str:
+        return os.path.join(self.directory, f"{audio_hash}.mp3")
+
+    def request(self, text: str, voice: str, model: str) -> str:
+        """Return the audio hash for ``text``, scheduling synthesis if it isn't cached."""
+        audio_hash = self.key(text, voice, model)
+        if self._touch(audio_hash):
+            self.hits += 1
+        elif audio_hash not in self._pending:
+            if self.upstream is not None and not self.upstream.available():
+                raise UpstreamUnavailable(f"{self.upstream.name}: circuit open")
+            self.misses += 1
+            task = asyncio.create_task(self._synthesize(audio_hash, text, voice, model))
+            self._pending[audio_hash] = task
+            task.add_done_callback(lambda _: self._pending.pop(audio_hash, None))
+        return audio_hash
+
+    async def get(self, audio_hash: str, timeout: float = 30) -> Optional[str]:
+        """Return the file path for ``audio_hash``, waiting for in-flight synthesis."""
+        task = self._pending.get(audio_hash)
+        if task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.path(audio_hash) if self._touch(audio_hash) else None
+
+    def _touch(self, audio_hash: str) -> bool:
+        with self._lock:
+            if audio_hash in self._sizes:
+                self._sizes.move_to_end(audio_hash)
+                return True
+        # Another worker sharing the directory may have synthesized it.
+        try:
+            size = os.stat(self.path(audio_hash)).st_size
+        except FileNotFoundError:
+            return False
+        self._add(audio_hash, size)
+        return True
+
+    async def _synthesize(self, audio_hash: str, text: str, voice: str, model: str) -> None:
+        # Synthesis outlives the chat request that scheduled it.
+        clear_deadline()
+        loop = asyncio.get_running_loop()
+        write = lambda: loop.run_in_executor(self.executor, self._write, audio_hash, text, voice, model)
+        try:
+            size = await (self.upstream.call(write) if self.upstream is not None else write())
+        except Exception as e:
+            print(f"Error generating audio: {e}")
+            return
+        self._add(audio_hash, size)
+
+    def _write(self, audio_hash: str, text: str, voice: str, model: str) -> int:
+        # Write to a temp name first so readers never see a partial file.
+        final_path = self.path(audio_hash)
+        part_path = f"{final_path}.{os.getpid()}.{threading.get_ident()}.part"
+        size = 0
+        try:
+            with open(part_path, "wb") as f:
+                for chunk in self.synthesize(text, voice, model):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(part_path, final_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        return size
+
+    def _add(self, audio_hash: str, size: int) -> None:
+        evicted = []
+        with self._lock:
+            self._total += size - self._sizes.pop(audio_hash, 0)
+            self._sizes[audio_hash] = size
+            while self._total > self.max_bytes and len(self._sizes) > 1:
+                old_hash, old_size = self._sizes.popitem(last=False)
+                self._total -= old_size
+                evicted.append(old_hash)
+        for old_hash in evicted:
+            try:
+                os.remove(self.path(old_hash))
+            except FileNotFoundError:
+                pass
+
+    def _load_index(self) -> None:
+        """
+        Rebuild the LRU order from files left by a previous run (oldest first).
+        Partial files are removed only once stale: another worker sharing the
+        directory may still be writing a recent one.
+        """
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.directory):
+            full_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(full_path)
+                if name.endswith(".part"):
+                    if now - stat.st_mtime > STALE_PART_SECONDS:
+                        os.remove(full_path)
+                    continue
+            except FileNotFoundError:
+                # Renamed or removed by another worker meanwhile
+                continue
+            if name.endswith(".mp3"):
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, audio_hash, size in sorted(entries):
+            self._add(audio_hash, size)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end) offsets.
+    Returns None for no/unsupported header; raises ValueError if unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[6:].strip().partition("-")
+    if not start_text:
+        length = int(end_text)
+        if length <= 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(start_text)
+    end = min(int(end_text), size - 1) if end_text else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def iter_file(path: str, start: int, end: int):
+    """Yield bytes ``start..end`` (inclusive) of ``path`` in chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,94 @@
+import asyncio
+import csv
+import io
+import zipfile
+from typing import AsyncIterator, Awaitable, Callable, Iterable, List, Tuple
+
+# --- Batch form export (streamed zip archive) ---
+
+
+class _Chunks:
+    """Write-only, unseekable sink for ZipFile: written bytes are collected until taken."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStream:
+    """
+    Builds a zip archive incrementally: each ``add`` returns the bytes of
+    that member, ready to send, and ``close`` the central directory. Only
+    the directory (a few dozen bytes per member) stays in memory.
+    """
+
+    def __init__(self, compression: int = zipfile.ZIP_STORED):
+        self._sink = _Chunks()
+        self._zip = zipfile.ZipFile(self._sink, mode="w", compression=compression)
+
+    def add(self, name: str, data: bytes) -> bytes:
+        self._zip.writestr(name, data)
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        self._zip.close()
+        return self._sink.take()
+
+
+def failure_reason(error: Exception) -> str:
+    """Why a session failed, for the manifest (HTTPException keeps it in ``detail``, not ``str()``)."""
+    return str(getattr(error, "detail", None) or error) or type(error).__name__
+
+
+async def export_zip(
+    session_ids: Iterable[str],
+    build: Callable[[str], Awaitable[Tuple[str, bytes]]],
+    concurrency: int = 16,
+) -> AsyncIterator[bytes]:
+    """
+    Stream a zip of ``build(session_id)`` -> (filename, pdf) for every session,
+    at most ``concurrency`` at a time, in completion order. A session that
+    fails is listed in the trailing ``manifest.csv`` instead of aborting the
+    export, since the response has already started.
+    """
+    archive = ZipStream()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(["session_id", "file", "status"])
+    pending = {}
+    ids = iter(session_ids)
+    try:
+        while True:
+            for session_id in ids:
+                pending[asyncio.ensure_future(build(session_id))] = session_id
+                if len(pending) >= concurrency:
+                    break
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                session_id = pending.pop(task)
+                try:
+                    filename, pdf_bytes = task.result()
+                except Exception as e:
+                    writer.writerow([session_id, "", f"error: {failure_reason(e)}"])
+                    continue
+                writer.writerow([session_id, filename, "ok"])
+                yield archive.add(filename, pdf_bytes)
+        yield archive.add("manifest.csv", manifest.getvalue().encode())
+        yield archive.close()
+    finally:
+        # The client went away (or the export failed): stop the remaining work
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,119 @@
+"""
+/chat latency for well-behaved users while one user floods the API, with
+admission control on and off. Good users each send a turn, read the reply
+and think; the abusive user keeps ``--abuse-concurrency`` requests in flight
+and retries rejections almost immediately. Gemini (stub, fixed latency) is
+limited to ``--gemini-concurrency`` calls, so it is the contended resource.
+
+Run from ``backend/``:
+    python -m benchmarks.bench_admission --users 20 --abuse-concurrency 64 --duration 20
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+from benchmarks.harness import StubbedBackend
+from benchmarks.stubs import ElevenLabsStub, GeminiStub
+
+counter = itertools.count()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else float("nan")
+
+
+async def turn(http, token: str, session_id) -> tuple:
+    # Unique messages, so no reply comes from the LLM cache
+    payload = {"message": f"My answer number {next(counter)}", "session_id": session_id}
+    start = time.perf_counter()
+    response = await http.post("/chat", json=payload, headers={"Authorization": f"Bearer {token}"})
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        return elapsed, response.status_code, session_id
+    return elapsed, 200, response.json()["session_id"]
+
+
+async def good_user(http, token: str, args, stop: asyncio.Event, samples: list, errors: list) -> None:
+    session_id = None
+    while not stop.is_set():
+        elapsed, status, session_id = await turn(http, token, session_id)
+        (samples if status == 200 else errors).append(elapsed if status == 200 else status)
+        await asyncio.sleep(args.think_time)
+
+
+async def abuser(http, token: str, stop: asyncio.Event, outcomes: dict) -> None:
+    session_id = None
+    while not stop.is_set():
+        _, status, session_id = await turn(http, token, session_id)
+        outcomes[status] = outcomes.get(status, 0) + 1
+        if status != 200:
+            await asyncio.sleep(0.05)
+
+
+async def scenario(main, http, auth0, args, abusive: bool) -> dict:
+    stop = asyncio.Event()
+    samples, errors, outcomes = [], [], {}
+    run = next(counter)
+    tasks = [
+        asyncio.create_task(good_user(http, auth0.mint(sub=f"auth0|good-{run}-{i}"), args, stop, samples, errors))
+        for i in range(args.users)
+    ]
+    if abusive:
+        token = auth0.mint(sub=f"auth0|abuser-{run}")
+        tasks += [asyncio.create_task(abuser(http, token, stop, outcomes)) for _ in range(args.abuse_concurrency)]
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return {"samples": samples, "errors": errors, "abuser": outcomes}
+
+
+async def main(args) -> None:
+    env = {"GEMINI_MAX_CONCURRENCY": str(args.gemini_concurrency), "GEMINI_MAX_QUEUE": "1024"}
+    gemini = GeminiStub(latency=args.gemini_latency)
+    tts = ElevenLabsStub(latency=0.0)
+    async with StubbedBackend(gemini=gemini, tts=tts, db_latency=args.db_latency, env=env, port=args.port) as backend:
+        main = backend.main
+
+        def admission():
+            return main.Admission(
+                max_active=64,
+                min_active=4,
+                max_queue=256,
+                max_queue_per_user=4,
+                max_wait=10,
+                buckets=main.MemoryBuckets(args.rate, args.burst),
+                overloaded=lambda: main.gemini_upstream.queued > 0 or not main.gemini_upstream.available(),
+            )
+
+        async with backend.client(connections=args.users + args.abuse_concurrency) as http:
+            print(f"{'scenario':<26} {'good turns':>10} {'p50':>8} {'p99':>8} {'rejected':>9}  abuser outcomes")
+            for name, abusive, admit in (
+                ("no abuser", False, True),
+                ("abuser, admission off", True, False),
+                ("abuser, admission on", True, True),
+            ):
+                main.admission = admission() if admit else None
+                result = await scenario(main, http, backend.auth0, args, abusive)
+                samples = result["samples"]
+                abuse = ", ".join(f"{status}: {count}" for status, count in sorted(result["abuser"].items())) or "-"
+                print(f"{name:<26} {len(samples):>10} {percentile(samples, 50) * 1000:6.0f}ms "
+                      f"{percentile(samples, 99) * 1000:6.0f}ms {len(result['errors']):>9}  {abuse}")
+                # Let the previous scenario's queues drain
+                await asyncio.sleep(args.gemini_latency * 2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="well-behaved users")
+    parser.add_argument("--think-time", type=float, default=2.0, help="pause between a good user's turns")
+    parser.add_argument("--abuse-concurrency", type=int, default=64, help="abuser's requests in flight")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per scenario")
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--gemini-concurrency", type=int, default=8)
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    parser.add_argument("--rate", type=float, default=0.5, help="per-user turns per second")
+    parser.add_argument("--burst", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8768)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,61 @@
+"""
+Prompt bytes sent to Gemini per turn: legacy string prompt vs. the rolling context window.
+
+Run from ``backend/``:  python -m benchmarks.bench_context --turns 500
+"""
+import argparse
+import time
+
+from context import ContextManager
+
+SYSTEM_PROMPT_BYTES = 2200  # Roughly the size of the SNAP persona/plan prompt.
+
+
+def legacy_prompt(history: list, message: str) -> str:
+    """The old per-turn prompt: static text + last 50 messages + the message again."""
+    context = "x" * SYSTEM_PROMPT_BYTES
+    for msg in history[-50:]:
+        context += f"{msg['sender']}: {msg['message']}\n"
+    context += f"User: {message}\n"
+    context += "AI: "
+    return context
+
+
+def main(turns: int, budget: int) -> None:
+    contexts = ContextManager(token_budget=budget)
+    context = contexts.new("bench")
+    history = []
+    checkpoints = {10, 50, 100, 250, 500, 1000, turns}
+
+    legacy_time = window_time = 0.0
+    print(f"{'turn':>6} {'legacy bytes':>14} {'window bytes':>14}")
+    for turn in range(1, turns + 1):
+        message = f"My answer for turn {turn} is something like this, with a few details."
+        reply = f"Thanks for sharing that. Here is question {turn + 1}: could you tell me a bit more?"
+
+        start = time.perf_counter()
+        history.append({"sender": "user", "message": message})
+        legacy = legacy_prompt(history, message)
+        legacy_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        context.append("user", message)
+        window = "\n".join(part for content in context.contents() for part in content["parts"])
+        window_time += time.perf_counter() - start
+
+        if turn in checkpoints:
+            print(f"{turn:>6} {len(legacy.encode()):>14} {len(window.encode()):>14}")
+
+        history.append({"sender": "ai", "message": reply})
+        context.append("ai", reply)
+
+    print(f"build time per turn: legacy {legacy_time / turns * 1e6:.1f} us, window {window_time / turns * 1e6:.1f} us")
+    print("(the window excludes the system prompt, which is sent as the model's system instruction)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--budget", type=int, default=1000, help="context token budget")
+    args = parser.parse_args()
+    main(args.turns, args.budget)
@@ -0,0 +1,279 @@
+"""
+End-to-end benchmark: concurrent users replay the recorded SNAP conversations
+in ``traces/snap_conversations.json`` through /chat, then download their
+completed applications with /download. One uvicorn worker serves main.py in
+this process with every external service stubbed (``harness.StubbedBackend``);
+``--profile`` sets the stubs' latency and error profile. Reports throughput,
+latency percentiles and errors per endpoint, the process's RSS and the
+upstream call counts. Runs are reproducible for a given ``--seed``.
+
+``--save`` writes the results as JSON. ``--compare`` checks this run against
+saved results and exits with status 1 if an endpoint's latency, throughput
+or error rate got worse by more than ``--tolerance``, so a performance
+change can be measured offline and checked for regressions.
+
+Run from ``backend/``:
+    python -m benchmarks.bench_e2e --profile typical --users 30 --save baseline.json
+    python -m benchmarks.bench_e2e --profile typical --users 30 --compare baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sys
+import time
+
+import yaml
+
+from benchmarks.harness import StubbedBackend
+from benchmarks.stubs import ElevenLabsStub, Faults, GeminiStub, Latency
+from form_packs import PACKS_DIR
+
+TRACES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces", "snap_conversations.json")
+
+# Per service: latency median/p99 in seconds, and the fault profile
+PROFILES = {
+    # No latency anywhere: what's left is the app's own overhead
+    "ideal": {},
+    "typical": {
+        "gemini": {"median": 0.8, "p99": 2.5},
+        "tts": {"median": 0.3, "p99": 0.8},
+        "db": {"median": 0.02, "p99": 0.08},
+        "jwks": {"median": 0.05, "p99": 0.2},
+    },
+    # A Gemini brownout, a flaky database and TTS errors
+    "degraded": {
+        "gemini": {"median": 1.5, "p99": 6.0, "error_rate": 0.05, "hang_rate": 0.01, "hang_latency": 10.0},
+        "tts": {"median": 0.5, "p99": 2.0, "error_rate": 0.02},
+        "db": {"median": 0.05, "p99": 0.3, "error_rate": 0.01},
+        "jwks": {"median": 0.1, "p99": 0.5},
+    },
+}
+
+LATENCY_METRICS = ("p50", "p95", "p99")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else float("nan")
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_profile(name: str) -> dict:
+    """A named profile, or a JSON file of the same shape."""
+    if name in PROFILES:
+        return PROFILES[name]
+    with open(name) as f:
+        return json.load(f)
+
+
+def latency(spec: dict, seed: int) -> Latency:
+    return Latency(spec.get("median", 0.0), spec.get("p99"), seed=seed)
+
+
+def faults(spec: dict, seed: int) -> Faults:
+    return Faults(spec.get("error_rate", 0.0), spec.get("hang_rate", 0.0), spec.get("hang_latency", 30.0), seed=seed)
+
+
+def interviewer():
+    """Gemini stub replies that walk through the SNAP pack's questions, like the real model would."""
+    with open(os.path.join(PACKS_DIR, "snap.yaml")) as f:
+        questions = [q["ask"] for q in yaml.safe_load(f)["prompt"]["questions"]]
+    return lambda contents: f"Thanks! Next: {questions[len(contents) // 2 % len(questions)]}"
+
+
+def summarize(latencies: list, errors: dict, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "errors": sum(errors.values()),
+        "statuses": errors,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        **{f"p{pct}": percentile(latencies, pct) for pct in (50, 95, 99)},
+        "mean": sum(latencies) / len(latencies) if latencies else float("nan"),
+    }
+
+
+async def converse(http, headers: dict, messages: list, args, rng: random.Random, latencies: list, errors: dict):
+    """
+    Replay one recorded conversation; returns its session id. A turn answered
+    with the apology for a failed Gemini call (``args.fallback``) counts as
+    an error.
+    """
+    await asyncio.sleep(rng.uniform(0, args.ramp))
+    session_id = None
+    for message in messages:
+        start = time.perf_counter()
+        response = await http.post("/chat", json={"message": message, "session_id": session_id}, headers=headers)
+        if response.status_code == 200:
+            elapsed = time.perf_counter() - start
+            data = response.json()
+            session_id = data["session_id"]
+            if data["reply"] == args.fallback:
+                errors["fallback"] = errors.get("fallback", 0) + 1
+            else:
+                latencies.append(elapsed)
+        else:
+            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+        await asyncio.sleep(args.think_time)
+    return session_id
+
+
+async def download(http, headers: dict, session_id: str, slots: asyncio.Semaphore, latencies: list, errors: dict):
+    async with slots:
+        start = time.perf_counter()
+        response = await http.post("/download", json={"session_id": session_id}, headers=headers)
+        if response.status_code == 200 and response.content.startswith(b"%PDF"):
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+
+
+async def run(args) -> dict:
+    with open(TRACES) as f:
+        traces = json.load(f)
+    profile = load_profile(args.profile)
+    spec = lambda service: profile.get(service, {})
+    rng = random.Random(args.seed)
+    backend = StubbedBackend(
+        gemini=GeminiStub(latency(spec("gemini"), args.seed), reply=interviewer(), faults=faults(spec("gemini"), args.seed)),
+        tts=ElevenLabsStub(latency(spec("tts"), args.seed + 1), faults=faults(spec("tts"), args.seed + 1)),
+        db_latency=latency(spec("db"), args.seed + 2),
+        db_faults=faults(spec("db"), args.seed + 2),
+        jwks_latency=latency(spec("jwks"), args.seed + 3),
+        port=args.port,
+    )
+    async with backend:
+        users = [(backend.headers(f"auth0|e2e-{i}"), rng.choice(traces)[:args.turns]) for i in range(args.users)]
+        args.fallback = backend.main.AI_ERROR_REPLY
+        async with backend.client(connections=args.users) as http:
+            # One untimed session first, so pools and caches that start lazily are running
+            headers = backend.headers("auth0|e2e-warmup")
+            warmup = argparse.Namespace(ramp=0, think_time=0, fallback=args.fallback)
+            session_id = await converse(http, headers, traces[0][:2], warmup, rng, [], {})
+            if session_id:
+                await download(http, headers, session_id, asyncio.Semaphore(1), [], {})
+            rss_start = rss_mb()
+
+            chat_latencies, chat_errors = [], {}
+            start = time.perf_counter()
+            session_ids = await asyncio.gather(*(
+                converse(http, headers, messages, args, random.Random(rng.random()), chat_latencies, chat_errors)
+                for headers, messages in users
+            ))
+            chat_elapsed = time.perf_counter() - start
+
+            download_latencies, download_errors = [], {}
+            slots = asyncio.Semaphore(args.download_concurrency)
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                download(http, headers, session_id, slots, download_latencies, download_errors)
+                for (headers, _), session_id in zip(users, session_ids) if session_id
+            ))
+            download_elapsed = time.perf_counter() - start
+
+        return {
+            "profile": args.profile,
+            "config": {k: getattr(args, k) for k in ("users", "turns", "think_time", "ramp", "download_concurrency", "seed")},
+            "endpoints": {
+                "/chat": summarize(chat_latencies, chat_errors, chat_elapsed),
+                "/download": summarize(download_latencies, download_errors, download_elapsed),
+            },
+            "memory": {"rss_start_mb": rss_start, "rss_end_mb": rss_mb(), "rss_peak_mb": peak_rss_mb()},
+            "upstream": {
+                "gemini_calls": backend.gemini.calls,
+                "tts_calls": backend.tts.calls,
+                "db_requests": backend.rest.requests,
+            },
+        }
+
+
+def report(results: dict) -> None:
+    print(f"profile {results['profile']}  {results['config']}")
+    print(f"{'endpoint':<10} {'requests':>8} {'errors':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'mean':>8}")
+    for endpoint, r in results["endpoints"].items():
+        print(f"{endpoint:<10} {r['requests']:>8} {r['errors']:>7} {r['throughput']:8.1f} "
+              + " ".join(f"{r[m] * 1000:6.0f}ms" for m in ("p50", "p95", "p99", "mean")))
+        if r["statuses"]:
+            print(f"{'':<10} statuses {r['statuses']}")
+    memory = results["memory"]
+    print(f"memory     RSS {memory['rss_start_mb']:.0f} MB -> {memory['rss_end_mb']:.0f} MB, peak {memory['rss_peak_mb']:.0f} MB")
+    print("upstream   " + "  ".join(f"{k}={v}" for k, v in results["upstream"].items()))
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float) -> list:
+    """
+    Print this run against ``baseline``; returns the regressions. A latency
+    must also grow by ``min_delta`` seconds, and throughput is only judged
+    for phases of a second or more: below that, a few dozen fast requests
+    mostly measure scheduling noise.
+    """
+    if (results["profile"], results["config"]) != (baseline["profile"], baseline["config"]):
+        print(f"warning: baseline ran {baseline['profile']} {baseline['config']}")
+    regressions = []
+
+    def check(name: str, old: float, new: float, worse: bool) -> None:
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"{name:<28} {old:10.4f} {new:10.4f} {change:+7.1f}%{'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append(name)
+
+    print(f"\n{'compared to baseline':<28} {'baseline':>10} {'this run':>10} {'change':>8}")
+    for endpoint, new in results["endpoints"].items():
+        old = baseline["endpoints"].get(endpoint)
+        if old is None:
+            continue
+        for metric in LATENCY_METRICS:
+            check(f"{endpoint} {metric} (s)", old[metric], new[metric],
+                  new[metric] > old[metric] * (1 + tolerance) and new[metric] - old[metric] > min_delta)
+        long_enough = min(old["seconds"], new["seconds"]) >= 1.0
+        check(f"{endpoint} req/s", old["throughput"], new["throughput"],
+              long_enough and new["throughput"] < old["throughput"] * (1 - tolerance))
+        old_rate, new_rate = old["errors"] / max(old["requests"], 1), new["errors"] / max(new["requests"], 1)
+        check(f"{endpoint} error rate", old_rate, new_rate, new_rate > old_rate + 0.01)
+    old_growth = baseline["memory"]["rss_peak_mb"] - baseline["memory"]["rss_start_mb"]
+    new_growth = results["memory"]["rss_peak_mb"] - results["memory"]["rss_start_mb"]
+    check("RSS growth (MB)", old_growth, new_growth, new_growth > old_growth * (1 + tolerance) and new_growth - old_growth > 10)
+    return regressions
+
+
+def main(args) -> int:
+    results = asyncio.run(run(args))
+    report(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.min_delta)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", default="typical", help=f"{', '.join(PROFILES)} or a JSON file")
+    parser.add_argument("--users", type=int, default=30, help="concurrent conversations")
+    parser.add_argument("--turns", type=int, default=None, help="replay at most this many turns per conversation")
+    parser.add_argument("--think-time", type=float, default=1.0, help="pause between a user's turns")
+    parser.add_argument("--ramp", type=float, default=2.0, help="users start spread over this many seconds")
+    parser.add_argument("--download-concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="compare with saved results; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="latency change in seconds too small to count")
+    parser.add_argument("--port", type=int, default=8769)
+    sys.exit(main(parser.parse_args()))
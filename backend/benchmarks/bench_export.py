@@ -0,0 +1,131 @@
+"""
+Batch export throughput: one /export request for many sessions versus the
+same sessions fetched one /download at a time, against a stub Supabase (in
+a forked process, with a simulated round trip) holding recorded-style SNAP
+conversations. The export is run with PDF rendering on the thread pool and
+on worker processes. Reports PDFs per minute, time to the first archive
+byte and the server's peak RSS growth.
+
+Run from ``backend/``:  python -m benchmarks.bench_export --sessions 500 --messages 40 --rtt 0.01
+"""
+import argparse
+import asyncio
+import io
+import multiprocessing
+import os
+import resource
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.harness import StubbedBackend
+from benchmarks.stubs import SupabaseStub
+
+ANSWERS = [
+    "I live in Texas",
+    "My name is {name}",
+    "My date of birth is 01/02/1985",
+    "My address is {n} Main Street, Austin TX",
+    "My phone number is 555-01{n:02d}",
+    "There are 3 people in my household",
+    "My monthly income is $1,{n:03d}",
+]
+
+
+def seed(db: SupabaseStub, sessions: int, messages: int) -> list:
+    session_ids = []
+    for s in range(sessions):
+        session_id = f"00000000-0000-0000-0000-{s:012d}"
+        session_ids.append(session_id)
+        db.tables["applications"].append({"id": session_id, "user_id": "1", "form_type": "SNAP"})
+        for i in range(messages):
+            answer = ANSWERS[i // 2 % len(ANSWERS)].format(name=f"Applicant {s}", n=s % 100)
+            db.tables["conversation_history"].append({
+                "id": len(db.tables["conversation_history"]) + 1,
+                "application_id": session_id,
+                "sender": "user" if i % 2 else "ai",
+                "message": answer if i % 2 else "Thanks! What is the next detail I should record?",
+                "created_at": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00",
+            })
+    return session_ids
+
+
+def serve(args, urls) -> None:
+    db = SupabaseStub()
+    urls.send(seed(db, args.sessions, args.messages))
+    with db.server(latency=args.rtt) as rest:
+        urls.send(rest.url)
+        urls.recv()
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def export(http, headers, session_ids) -> tuple:
+    start = time.perf_counter()
+    first_byte = None
+    archive = io.BytesIO()
+    async with http.stream("POST", "/export", json={"session_ids": session_ids}, headers=headers) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            first_byte = first_byte or time.perf_counter() - start
+            archive.write(chunk)
+    elapsed = time.perf_counter() - start
+    names = zipfile.ZipFile(archive).namelist()
+    return elapsed, first_byte, len(names) - 1, archive.tell()
+
+
+async def one_by_one(http, headers, session_ids) -> float:
+    start = time.perf_counter()
+    for session_id in session_ids:
+        response = await http.post("/download", json={"session_id": session_id}, headers=headers)
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def main(args) -> None:
+    parent, child = multiprocessing.Pipe()
+    server_process = multiprocessing.get_context("fork").Process(target=serve, args=(args, child), daemon=True)
+    server_process.start()
+    session_ids = parent.recv()
+    rest_url = parent.recv()
+
+    async with StubbedBackend(rest_url=rest_url, env={"EXPORT_PROCESS_WORKERS": "0"}, port=args.port) as backend:
+        main = backend.main
+        headers = backend.headers(permissions=["export:forms"])
+
+        def cold() -> None:
+            # Every run fetches, extracts and renders from scratch
+            main.form_extractor._states.clear()
+            main.pdf_cache.clear()
+
+        processes = ProcessPoolExecutor(max_workers=args.workers)
+        async with backend.client() as http:
+            sample = session_ids[:args.baseline]
+            cold()
+            elapsed = await one_by_one(http, headers, sample)
+            print(f"{'one /download at a time':<32} {len(sample) / elapsed * 60:8.0f} PDFs/min  ({len(sample)} sessions)")
+
+            for name, executor in (("/export, thread pool", main.blocking_executor), (f"/export, {args.workers} processes", processes)):
+                main.export_executor = executor
+                cold()
+                before = rss_mb()
+                elapsed, first_byte, pdfs, size = await export(http, headers, session_ids)
+                print(f"{name:<32} {pdfs / elapsed * 60:8.0f} PDFs/min  first byte {first_byte * 1000:6.0f} ms  "
+                      f"{size / 1024 / 1024:6.1f} MB zip  peak RSS +{rss_mb() - before:.0f} MB")
+
+        processes.shutdown()
+    parent.send("stop")
+    server_process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=40, help="messages per session")
+    parser.add_argument("--rtt", type=float, default=0.01, help="simulated round trip to Supabase")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="render processes")
+    parser.add_argument("--baseline", type=int, default=50, help="sessions downloaded one at a time")
+    parser.add_argument("--port", type=int, default=8767)
+    asyncio.run(main(parser.parse_args()))
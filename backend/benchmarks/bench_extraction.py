@@ -0,0 +1,134 @@
+"""
+Form-field extraction over synthetic SNAP conversations: the old per-keyword
+scan of the whole history vs. the compiled matcher, full re-scan and incremental.
+
+Run from ``backend/``:  python -m benchmarks.bench_extraction
+"""
+import argparse
+import os
+import random
+import time
+
+from form_packs import PACKS_DIR, load_pack
+
+SNAP_MATCHER = load_pack(os.path.join(PACKS_DIR, "snap.yaml")).matcher
+
+ANSWERS = [
+    "I live in the state of Texas and prefer English",
+    "My full name is Jordan Example, date of birth 1990-04-12",
+    "Phone number 555-0100, email jordan@example.com",
+    "My address is 12 Example Road, Springfield",
+    "Household size is 3",
+    "First member: Sam, child, 2015-02-01",
+    "Second member: Alex, spouse, 1991-06-30",
+    "SSN last 4 is 1234 and I am a US citizen",
+    "I am employed at a grocery store, gross income amount 1800 per month",
+    "Other income: 200 from unemployment",
+    "No other income",
+    "Rent is 900 a month",
+    "We pay electric and gas utilities",
+    "About 150 cash and a bank account with 300",
+    "Yes, please generate the summary",
+    "ok",
+    "sure, thanks!",
+]
+
+
+def legacy_extract(conversation_history: list) -> dict:
+    """The old keyword chain: every substring test re-scans each message."""
+    form_data = {field: "" for field in SNAP_MATCHER.fields}
+    for msg in conversation_history:
+        if msg.get("sender") != "user":
+            continue
+        raw = msg.get("message", "")
+        content = raw.lower()
+        if "state" in content and not form_data["state"]:
+            form_data["state"] = raw
+        if ("language" in content or "english" in content or "spanish" in content) and not form_data["language"]:
+            form_data["language"] = raw
+        if ("full name" in content or "name is" in content or content.startswith("name")) and not form_data["full_name"]:
+            form_data["full_name"] = raw
+        if ("dob" in content or "birth" in content) and not form_data["dob"]:
+            form_data["dob"] = raw
+        if ("phone" in content or "number" in content) and not form_data["phone"]:
+            form_data["phone"] = raw
+        if "email" in content and not form_data["email"]:
+            form_data["email"] = raw
+        if "address" in content and not form_data["address"]:
+            form_data["address"] = raw
+        if ("household" in content and "size" in content) and not form_data["household_size"]:
+            form_data["household_size"] = raw
+        if ("member 1" in content or "first member" in content) and not form_data["member1"]:
+            form_data["member1"] = raw
+        if ("member 2" in content or "second member" in content) and not form_data["member2"]:
+            form_data["member2"] = raw
+        if ("ssn" in content or "last 4" in content) and not form_data["ssn_last4"]:
+            form_data["ssn_last4"] = raw
+        if ("citizen" in content or "residen" in content or "immigrant" in content) and not form_data["citizenship"]:
+            form_data["citizenship"] = raw
+        if ("employ" in content) and not form_data["employment"]:
+            form_data["employment"] = raw
+        if ("income" in content and ("gross" in content or "amount" in content)) and not form_data["income"]:
+            form_data["income"] = raw
+        if ("other" in content and "income" in content) and not form_data["other_income1"]:
+            form_data["other_income1"] = raw
+        elif ("other" in content and "income" in content) and not form_data["other_income2"]:
+            form_data["other_income2"] = raw
+        if ("rent" in content or "mortgage" in content) and not form_data["rent"]:
+            form_data["rent"] = raw
+        if ("utility" in content or "utilities" in content) and not form_data["utilities"]:
+            form_data["utilities"] = raw
+        if ("asset" in content or "bank" in content or "cash" in content) and not form_data["assets"]:
+            form_data["assets"] = raw
+    return form_data
+
+
+def compiled_extract(conversation_history: list) -> dict:
+    state = SNAP_MATCHER.new_state()
+    for msg in conversation_history:
+        state.update(msg["sender"], msg["message"])
+    return state.values
+
+
+def conversation(size: int, rng: random.Random) -> list:
+    history = []
+    for i in range(size):
+        if i % 2:
+            history.append({"sender": "ai", "message": "Thanks! Could you tell me the next detail?"})
+        else:
+            history.append({"sender": "user", "message": rng.choice(ANSWERS)})
+    return history
+
+
+def timed(func, *args, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(sizes) -> None:
+    rng = random.Random(7)
+    print(f"{'messages':>9} {'legacy scan':>13} {'compiled scan':>14} {'incremental/msg':>16} {'download':>10}")
+    for size in sizes:
+        history = conversation(size, rng)
+        assert legacy_extract(history) == compiled_extract(history)
+        legacy = timed(legacy_extract, history)
+        compiled = timed(compiled_extract, history)
+
+        state = SNAP_MATCHER.new_state()
+        start = time.perf_counter()
+        for msg in history:
+            state.update(msg["sender"], msg["message"])
+        per_message = (time.perf_counter() - start) / size
+        download = timed(lambda: dict(state.values))
+
+        print(f"{size:>9} {legacy * 1e3:>10.3f} ms {compiled * 1e3:>11.3f} ms {per_message * 1e6:>13.2f} us {download * 1e6:>7.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    main(parser.parse_args().sizes)
@@ -0,0 +1,74 @@
+"""
+Form Pack startup: load and compile 100+ pack files, then measure the
+per-request lookup, an idle mtime poll and a hot reload of one changed file.
+
+Run from ``backend/``:  python -m benchmarks.bench_form_packs --packs 200
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+from form_packs import PACKS_DIR, FormPackRegistry
+
+
+def write_packs(directory: str, count: int) -> list:
+    with open(os.path.join(PACKS_DIR, "snap.yaml"), encoding="utf-8") as f:
+        base = yaml.safe_load(f)
+    paths = []
+    for i in range(count):
+        form_type = "SNAP" if i == 0 else f"FORM{i:04d}"
+        # Distinct titles, keywords and prompts, so nothing is shared between packs
+        pack = dict(base, form_type=form_type, name=f"Form {i}")
+        pack["pdf"] = dict(base["pdf"], title=f"CivicScribe - Form {i} Summary")
+        pack["extraction"] = base["extraction"] + [{"fields": [f"extra_{i}"], "match": [f"keyword {i}"]}]
+        pack["prompt"] = dict(base["prompt"], persona=f"{base['prompt']['persona']} (form {i})")
+        path = os.path.join(directory, f"{form_type.lower()}.yaml")
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.safe_dump(pack, f, sort_keys=False)
+        paths.append(path)
+    return paths
+
+
+def main(count: int, lookups: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_packs(tmp, count)
+        registry = FormPackRegistry(tmp, poll_interval=0)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        registry.load()
+        elapsed = time.perf_counter() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"startup     {len(registry.form_types())} packs in {elapsed * 1000:.0f} ms "
+              f"({elapsed / count * 1000:.2f} ms/pack, {memory / 1e6:.1f} MB)")
+
+        form_types = registry.form_types()
+        start = time.perf_counter()
+        for i in range(lookups):
+            registry.get(form_types[i % len(form_types)])
+        print(f"lookup      {(time.perf_counter() - start) / lookups * 1e9:.0f} ns/request")
+
+        start = time.perf_counter()
+        changed = registry.reload()
+        print(f"idle poll   {(time.perf_counter() - start) * 1000:.2f} ms (changed={changed})")
+
+        target = paths[count // 2]
+        with open(target, "a", encoding="utf-8") as f:
+            f.write("\n# edited\n")
+        os.utime(target, (time.time() + 1, time.time() + 1))
+        start = time.perf_counter()
+        changed = registry.reload()
+        print(f"hot reload  {(time.perf_counter() - start) * 1000:.2f} ms for 1 changed file (changed={changed})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packs", type=int, default=200)
+    parser.add_argument("--lookups", type=int, default=1_000_000)
+    args = parser.parse_args()
+    main(args.packs, args.lookups)
@@ -0,0 +1,124 @@
+"""
+conversation_history reads for long sessions against the stub PostgREST
+server: the old unpaginated ``select *`` versus the windowed read a context
+rebuild now makes, and a full-history form extraction (/download) from one
+response versus the keyset-paginated stream. Reports latency, response
+bytes and peak Python memory of the reading side (the stub runs in a
+forked process).
+
+Run from ``backend/``:  python -m benchmarks.bench_history --messages 10000 50000 --rtt 0.01
+"""
+import argparse
+import asyncio
+import multiprocessing
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from postgrest import AsyncPostgrestClient
+
+from benchmarks.stubs import SupabaseStub
+from context import ContextManager
+from form_packs import FormPackRegistry, PACKS_DIR
+from persistence import HistoryReader, WriteBehindQueue
+
+
+def seed(db: SupabaseStub, application_id: str, count: int) -> None:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    answers = ["I live in Texas", "My name is Alex Doe", "My phone number is 555-0100", "yes"]
+    for i in range(count):
+        db.tables["conversation_history"].append({
+            "id": len(db.tables["conversation_history"]) + 1,
+            "application_id": application_id,
+            "sender": "user" if i % 2 else "ai",
+            "message": answers[i // 2 % len(answers)] if i % 2 else "Thanks! Could you tell me a bit more about your household?",
+            "created_at": (start + timedelta(seconds=i)).isoformat(),
+        })
+
+
+def serve(db: SupabaseStub, rtt: float, urls) -> None:
+    with db.server(latency=rtt) as rest:
+        urls.send(rest.url)
+        urls.recv()
+
+
+async def measure(received: list, func) -> tuple:
+    received[0] = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = await func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, received[0], peak, result
+
+
+async def main(args) -> None:
+    db = SupabaseStub()
+    for count in args.messages:
+        seed(db, f"app-{count}", count)
+    packs = FormPackRegistry(PACKS_DIR)
+    packs.load()
+    pack = packs.get()
+
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.get_context("fork").Process(target=serve, args=(db, args.rtt, child), daemon=True)
+    server.start()
+    try:
+        client = AsyncPostgrestClient(f"{parent.recv()}/rest/v1")
+        received = [0]
+
+        async def count_bytes(response):
+            received[0] += int(response.headers.get("content-length", 0))
+
+        client.session.event_hooks["response"].append(count_bytes)
+        table = lambda: client.table("conversation_history")
+        reader = HistoryReader(table, WriteBehindQueue(lambda rows: asyncio.sleep(0)), page_size=args.page_size)
+        contexts = ContextManager(token_budget=args.token_budget)
+
+        async def select_all(application_id):
+            return (await table().select("*").eq("application_id", application_id).order("created_at").execute()).data
+
+        async def rebuild(load):
+            context = contexts.new("bench")
+            for msg in await load():
+                context.append(msg["sender"], msg["message"])
+            return len(context.turns)
+
+        async def extract(rows):
+            state = pack.matcher.new_state()
+            async for msg in rows:
+                state.update(msg["sender"], msg["message"])
+            return state.messages
+
+        async def listed(load):
+            for msg in await load():
+                yield msg
+
+        print(f"{'messages':>8}  {'read':<28} {'latency':>9} {'bytes':>11} {'peak mem':>10}  result")
+        for count in args.messages:
+            application_id = f"app-{count}"
+            cases = [
+                ("context: select * (old)", lambda: rebuild(lambda: select_all(application_id))),
+                ("context: recent window", lambda: rebuild(lambda: reader.recent(application_id, args.window, args.token_budget))),
+                ("download: select * (old)", lambda: extract(listed(lambda: select_all(application_id)))),
+                ("download: keyset stream", lambda: extract(reader.iterate(application_id))),
+            ]
+            for name, func in cases:
+                await func()  # builds the stub's index, as the migration does for the real table
+                elapsed, sent, peak, result = await measure(received, func)
+                print(f"{count:>8}  {name:<28} {elapsed * 1000:7.1f}ms {sent / 1024:9.0f}KB {peak / 1024 / 1024:8.1f}MB  {result}")
+        await client.aclose()
+    finally:
+        parent.send("stop")
+        server.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[10000, 50000], help="session lengths")
+    parser.add_argument("--rtt", type=float, default=0.01, help="simulated round trip to Supabase")
+    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument("--token-budget", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=500)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Token verification cost: per-request JWKS fetch vs. the cached key store.
+
+Run from ``backend/``:  python -m benchmarks.bench_jwks --requests 500 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+import jwt
+
+from benchmarks.stubs import Auth0Stub, jwks_server
+from jwks import JWKSKeyStore, TokenCache
+
+
+def legacy_verify(token: str, jwks_url: str, auth0: Auth0Stub) -> dict:
+    """The old path: fetch the JWKS and rebuild the RSA key on every request."""
+    jwks = httpx.get(jwks_url).json()
+    header = jwt.get_unverified_header(token)
+    rsa_key = next(key for key in jwks["keys"] if key["kid"] == header["kid"])
+    return jwt.decode(
+        token,
+        key=jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(rsa_key)),
+        audience=auth0.audience,
+        issuer=f"https://{auth0.domain}/",
+        algorithms=["RS256"],
+    )
+
+
+async def store_verify(token: str, store: JWKSKeyStore, auth0: Auth0Stub, cache: TokenCache = None) -> dict:
+    if cache is not None:
+        claims = cache.get(token)
+        if claims is not None:
+            return claims
+    key = await store.get_key(jwt.get_unverified_header(token)["kid"])
+    claims = jwt.decode(
+        token,
+        key=key.key,
+        audience=auth0.audience,
+        issuer=f"https://{auth0.domain}/",
+        algorithms=[key.algorithm],
+    )
+    if cache is not None:
+        cache.set(token, claims)
+    return claims
+
+
+def report(name: str, elapsed: float, n: int) -> None:
+    print(f"{name:<32} {elapsed / n * 1e6:>10.1f} us/verify  {n / elapsed:>10.0f} verify/s")
+
+
+async def main(n: int, latency: float) -> None:
+    auth0 = Auth0Stub()
+    tokens = [auth0.mint(sub=f"auth0|user-{i % 50}") for i in range(n)]
+
+    with jwks_server(auth0, latency=latency) as server:
+        jwks_url = f"{server.url}/.well-known/jwks.json"
+
+        start = time.perf_counter()
+        for token in tokens:
+            legacy_verify(token, jwks_url, auth0)
+        report("legacy (fetch per request)", time.perf_counter() - start, n)
+
+        store = JWKSKeyStore(jwks_url)
+        await store.refresh()
+        start = time.perf_counter()
+        for token in tokens:
+            await store_verify(token, store, auth0)
+        report("key store (signature check)", time.perf_counter() - start, n)
+
+        cache = TokenCache()
+        for token in tokens:
+            await store_verify(token, store, auth0, cache)
+        start = time.perf_counter()
+        for token in tokens:
+            await store_verify(token, store, auth0, cache)
+        report("key store + token cache (hit)", time.perf_counter() - start, n)
+
+        print(f"JWKS fetches served by stub: {server.requests}")
+        await store.client.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub JWKS server latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency))
@@ -0,0 +1,113 @@
+"""
+Replays recorded SNAP conversations against a stub Gemini, with and without
+the response cache: upstream calls, per-turn latency, hit ratio and the
+upstream latency the cache saved. Users arrive in bursts, so identical
+first turns are in flight together and get coalesced.
+
+Run from ``backend/``:
+    python -m benchmarks.bench_llm_cache --users 300 --burst 50 --gemini-latency 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.stubs import GeminiStub
+from context import ConversationContext
+from llm_cache import ResponseCache
+
+TRACES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces", "snap_conversations.json")
+VERSION = "bench-model:snap"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def scripted_reply(contents) -> str:
+    """The plan's next question, by how many user answers the window holds."""
+    answers = sum(len(c["parts"]) for c in contents if c["role"] == "user")
+    return f"Thanks! Question {answers + 1}: please tell me the next detail."
+
+
+async def generate(gemini: GeminiStub, contents: list) -> str:
+    response = await gemini.generate_content_async(contents)
+    return response.text
+
+
+async def replay(trace: list, gemini: GeminiStub, cache, latencies: list, budget: int) -> None:
+    context = ConversationContext(budget)
+    for message in trace:
+        context.append("user", message)
+        contents = context.contents()
+        start = time.perf_counter()
+        if cache is not None and cache.cacheable(contents):
+            reply = await cache.get_or_compute(
+                cache.key(VERSION, contents), lambda: generate(gemini, contents)
+            )
+        else:
+            reply = await generate(gemini, contents)
+        latencies.append(time.perf_counter() - start)
+        context.append("ai", reply)
+
+
+async def run(traces: list, args, cache) -> tuple:
+    gemini = GeminiStub(latency=args.gemini_latency, reply=scripted_reply)
+    rng = random.Random(args.seed)
+    latencies: list = []
+    start = time.perf_counter()
+    for wave in range(0, args.users, args.burst):
+        users = min(args.burst, args.users - wave)
+        await asyncio.gather(*(
+            replay(rng.choice(traces)[:args.turns], gemini, cache, latencies, args.budget) for _ in range(users)
+        ))
+    return gemini.calls, latencies, time.perf_counter() - start
+
+
+def report(name: str, calls: int, latencies: list, elapsed: float, cache=None) -> None:
+    print(f"{name:<9} upstream={calls:<6} turns={len(latencies):<6} "
+          f"p50={percentile(latencies, 50) * 1000:6.1f} ms  p99={percentile(latencies, 99) * 1000:6.1f} ms  "
+          f"mean={statistics.mean(latencies) * 1000:6.1f} ms  wall={elapsed:.2f} s")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"{'':<9} hits={stats['hits']} coalesced={stats['coalesced']} misses={stats['misses']} "
+              f"hit_ratio={stats['hit_ratio']:.1%} saved={stats['saved_seconds']:.1f} s")
+
+
+async def main(args) -> None:
+    with open(TRACES, encoding="utf-8") as f:
+        traces = json.load(f)
+
+    report("no cache", *await run(traces, args, None))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "responses.db") if args.persist else None
+        cache = ResponseCache(max_turns=args.max_turns, path=path)
+        report("cache", *await run(traces, args, cache), cache=cache)
+        cache.close()
+
+        if path:
+            # A restarted worker starts warm from the SQLite file
+            start = time.perf_counter()
+            warm = ResponseCache(max_turns=args.max_turns, path=path)
+            print(f"{'restart':<9} {warm.stats()['size']} entries loaded in {(time.perf_counter() - start) * 1000:.1f} ms")
+            report("warm", *await run(traces, args, warm), cache=warm)
+            warm.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--burst", type=int, default=50, help="users arriving at the same moment")
+    parser.add_argument("--turns", type=int, default=16, help="answers replayed per user")
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--max-turns", type=int, default=6, help="longest window that is cached")
+    parser.add_argument("--budget", type=int, default=1000, help="context token budget")
+    parser.add_argument("--persist", action="store_true", help="persist to SQLite and replay again after a restart")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
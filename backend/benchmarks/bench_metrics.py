@@ -0,0 +1,113 @@
+"""
+Cost of the request instrumentation: per-hook microbenchmarks, then /chat
+latency through the whole app (served in-process over ASGI, stubs with
+no latency so the instrumentation's share is as large as it can be) with
+metrics on and off. Each sample is a fresh session of ``--turns`` turns,
+so both settings see the same history lengths, and samples come in pairs
+run in random order. Prints the /metrics page size.
+
+Run from ``backend/``:  python -m benchmarks.bench_metrics --requests 2000 --turns 5
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import timeit
+
+from benchmarks.harness import StubbedBackend
+from benchmarks.stubs import ElevenLabsStub, GeminiStub
+from metrics import Histogram, Metrics, MetricsMiddleware
+
+
+def micro(number: int) -> None:
+    enabled, disabled = Metrics(), Metrics(enabled=False)
+    histogram = Histogram("bench_seconds", "bench", ("stage",))
+
+    def stage(metrics):
+        with metrics.stage("gemini"):
+            pass
+
+    cases = [
+        ("Histogram.observe", lambda: histogram.observe(0.012, "gemini")),
+        ("stage (enabled)", lambda: stage(enabled)),
+        ("stage (disabled)", lambda: stage(disabled)),
+    ]
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+        print(f"{name:<22} {seconds * 1e9:8.0f} ns")
+
+    async def endpoint(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    async def middleware_cost(app) -> float:
+        scope = {"type": "http", "endpoint": endpoint}
+        start = time.perf_counter()
+        for _ in range(number):
+            await app(scope, receive, send)
+        return (time.perf_counter() - start) / number
+
+    bare = asyncio.run(middleware_cost(endpoint))
+    wrapped = asyncio.run(middleware_cost(MetricsMiddleware(endpoint, enabled)))
+    print(f"{'MetricsMiddleware':<22} {(wrapped - bare) * 1e9:8.0f} ns per request")
+
+
+async def end_to_end(args) -> None:
+    gemini = GeminiStub(latency=0.0, reply=lambda contents: f"Question {len(contents)}?")
+    # One user sends every request, so lift the per-user rate limit
+    env = {"CHAT_RATE_PER_USER": "0"}
+    async with StubbedBackend(gemini=gemini, tts=ElevenLabsStub(latency=0.0), env=env, serve=False) as backend:
+        main = backend.main
+        headers = backend.headers()
+
+        async with backend.client() as http:
+
+            async def session(turns: int) -> list:
+                latencies, session_id = [], None
+                for i in range(turns):
+                    start = time.perf_counter()
+                    response = await http.post("/chat", json={"message": f"answer {i}", "session_id": session_id}, headers=headers)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+                    session_id = response.json()["session_id"]
+                return latencies
+
+            for _ in range(max(args.requests // args.turns // 10, 1)):
+                await session(args.turns)
+            rng = random.Random(args.seed)
+            results = {True: [], False: []}
+            differences = []
+            for _ in range(max(args.requests // args.turns, 1)):
+                pair = {}
+                for enabled in rng.sample([False, True], 2):
+                    main.metrics.enabled = enabled
+                    pair[enabled] = await session(args.turns)
+                    results[enabled].extend(pair[enabled])
+                differences.append(statistics.mean(pair[True]) - statistics.mean(pair[False]))
+            main.metrics.enabled = True
+            page = (await http.get("/metrics")).text
+
+    off, on = statistics.median(results[False]), statistics.median(results[True])
+    low, median, high = statistics.quantiles(differences, n=4)
+    print(f"/chat median, metrics off  {off * 1e6:8.0f} us")
+    print(f"/chat median, metrics on   {on * 1e6:8.0f} us  ({(on - off) / off * 100:+.1f}%)")
+    print(f"on - off per session pair  {median * 1e6:+8.0f} us per request (quartiles {low * 1e6:+.0f} .. {high * 1e6:+.0f} us)")
+    print(f"/metrics page              {len(page.splitlines())} lines, {len(page)} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000, help="iterations per microbenchmark")
+    parser.add_argument("--requests", type=int, default=2000, help="/chat requests per setting")
+    parser.add_argument("--turns", type=int, default=5, help="turns per session sample")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the on/off order of each pair")
+    args = parser.parse_args()
+    micro(args.number)
+    asyncio.run(end_to_end(args))
@@ -0,0 +1,109 @@
+"""
+Chat-reply latency through a Gemini brownout, with and without the
+resilience layer. A fault-injecting stub Gemini is healthy, then stalls
+(or errors) for a window, then recovers; clients keep sending turns
+throughout. Reports p50/p99 latency and fallback replies per phase.
+
+Run from ``backend/``:
+    python -m benchmarks.bench_resilience --clients 100 --brownout 10 --hang-latency 30
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.stubs import Faults, GeminiStub
+from resilience import CircuitBreaker, Upstream, UpstreamUnavailable, request_deadline
+
+CONTENTS = [{"role": "user", "parts": ["Texas, English"]}]
+PHASES = ("healthy", "brownout", "recovery")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def client(gemini: GeminiStub, upstream, args, phase: list, samples: dict, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started_in = phase[0]
+        start = time.perf_counter()
+        fallback = False
+        try:
+            if upstream is None:
+                await gemini.generate_content_async(CONTENTS)
+            else:
+                with request_deadline(args.deadline):
+                    await upstream.call(gemini.generate_content_async, CONTENTS)
+        except (UpstreamUnavailable, asyncio.TimeoutError, ConnectionError):
+            fallback = True
+        samples[started_in].append((time.perf_counter() - start, fallback))
+        await asyncio.sleep(args.think_time)
+
+
+async def run(args, guarded: bool) -> dict:
+    faults = Faults(seed=1)
+    gemini = GeminiStub(latency=args.gemini_latency, faults=faults)
+    upstream = Upstream(
+        "gemini",
+        max_concurrency=args.concurrency,
+        max_queue=args.queue,
+        timeout=args.timeout,
+        retries=2,
+        backoff=0.05,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=args.reset),
+    ) if guarded else None
+    phase = ["healthy"]
+    samples = {name: [] for name in PHASES}
+    stop = asyncio.Event()
+    clients = [asyncio.create_task(client(gemini, upstream, args, phase, samples, stop)) for _ in range(args.clients)]
+
+    await asyncio.sleep(args.phase)
+    phase[0] = "brownout"
+    if args.mode == "hang":
+        faults.hang_rate, faults.hang_latency = 1.0, args.hang_latency
+    else:
+        faults.error_rate = 1.0
+    await asyncio.sleep(args.brownout)
+    phase[0] = "recovery"
+    faults.hang_rate = faults.error_rate = 0.0
+    await asyncio.sleep(args.phase + (args.reset if guarded else 0))
+    stop.set()
+    # Unguarded clients may still be stuck in a hung call; their samples count too
+    await asyncio.gather(*clients)
+    return {"samples": samples, "upstream": upstream.stats() if upstream else None, "calls": gemini.calls}
+
+
+def report(name: str, result: dict) -> None:
+    print(f"{name} (upstream calls: {result['calls']})")
+    for phase in PHASES:
+        samples = result["samples"][phase]
+        if not samples:
+            continue
+        latencies = [latency for latency, _ in samples]
+        fallbacks = sum(1 for _, fallback in samples if fallback)
+        print(f"  {phase:<9} turns={len(samples):<6} p50={percentile(latencies, 50) * 1000:8.0f} ms  "
+              f"p99={percentile(latencies, 99) * 1000:8.0f} ms  fallbacks={fallbacks}")
+    if result["upstream"]:
+        print("  " + "  ".join(f"{k}={v}" for k, v in result["upstream"].items()))
+
+
+async def main(args) -> None:
+    report("unguarded", await run(args, guarded=False))
+    report("guarded", await run(args, guarded=True))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--gemini-latency", type=float, default=0.3)
+    parser.add_argument("--mode", choices=("hang", "error"), default="hang")
+    parser.add_argument("--hang-latency", type=float, default=30.0, help="how long a stalled call takes")
+    parser.add_argument("--phase", type=float, default=3.0, help="seconds of healthy traffic before and after")
+    parser.add_argument("--brownout", type=float, default=10.0, help="seconds of upstream brownout")
+    parser.add_argument("--think-time", type=float, default=0.1, help="pause between a client's turns")
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-attempt timeout")
+    parser.add_argument("--deadline", type=float, default=3.0, help="per-request deadline")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queue", type=int, default=128)
+    parser.add_argument("--reset", type=float, default=2.0, help="circuit breaker reset timeout")
+    asyncio.run(main(parser.parse_args()))
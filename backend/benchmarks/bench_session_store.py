@@ -0,0 +1,66 @@
+"""
+Session-store soak test: memory growth of the old unbounded DEMO_HISTORY dict
+vs. the bounded memory store, plus SQLite (WAL) store throughput.
+
+Run from ``backend/``:  python -m benchmarks.bench_session_store --sessions 20000 --messages 30
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sessions import MemorySessionStore, SQLiteSessionStore
+
+
+def message(i: int) -> str:
+    return f"My answer number {i} is 801 Example Street, Springfield, with some extra detail."
+
+
+async def soak(name: str, append, sessions: int, messages: int) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    step = max(sessions // 5, 1)
+    for s in range(sessions):
+        for m in range(messages):
+            await append(f"session-{s}", "user" if m % 2 == 0 else "ai", message(m))
+        if (s + 1) % step == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"{name:<10} sessions={s + 1:>7}  memory={current / 1e6:>8.1f} MB")
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    print(f"{name:<10} {sessions * messages / elapsed:,.0f} appends/s")
+
+
+async def main(sessions: int, messages: int, max_bytes: int) -> None:
+    legacy = {}
+
+    async def legacy_append(session_id, sender, text):
+        legacy.setdefault(session_id, []).append({"sender": sender, "message": text})
+
+    await soak("legacy", legacy_append, sessions, messages)
+    legacy.clear()
+
+    store = MemorySessionStore(max_bytes=max_bytes)
+    await soak("memory", store.append, sessions, messages)
+    print(f"memory     {store.stats()}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_store = SQLiteSessionStore(os.path.join(tmp, "sessions.db"))
+        sqlite_sessions = max(sessions // 20, 1)
+        await soak("sqlite", sqlite_store.append, sqlite_sessions, messages)
+        start = time.perf_counter()
+        for s in range(sqlite_sessions):
+            await sqlite_store.history(f"session-{s}")
+        print(f"sqlite     {(time.perf_counter() - start) / sqlite_sessions * 1e6:.0f} us/history read")
+        sqlite_store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=30)
+    parser.add_argument("--max-bytes", type=int, default=16 * 1024 * 1024, help="memory store cap")
+    args = parser.parse_args()
+    asyncio.run(main(args.sessions, args.messages, args.max_bytes))
@@ -0,0 +1,99 @@
+"""
+Startup time and first-request latency of the backend, each run in a fresh
+process against local stubs (Auth0 JWKS and Supabase with a simulated
+round-trip time; Gemini and ElevenLabs in-process).
+
+Compares warm-up on/off (``WARMUP``) and, with ``--eager``, the cost of
+importing reportlab / google.generativeai / elevenlabs up front.
+
+Run from ``backend/``:  python -m benchmarks.bench_startup --runs 5 --rtt 0.05
+"""
+import argparse
+import asyncio
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("reportlab.pdfgen.canvas", "google.generativeai", "elevenlabs")
+
+
+async def child(args) -> None:
+    from benchmarks.harness import StubbedBackend
+    from benchmarks.stubs import ElevenLabsStub, GeminiStub
+
+    start = time.perf_counter()
+    if args.eager:
+        for name in HEAVY_MODULES:
+            try:
+                __import__(name)
+            except ImportError:
+                pass
+    eager = time.perf_counter() - start
+
+    env = {"WARMUP": "1" if args.warmup else "0", "PRELOAD_AI_SDKS": "1", "FORM_PACKS_POLL_INTERVAL": "0"}
+    backend = StubbedBackend(
+        gemini=GeminiStub(latency=0.0), tts=ElevenLabsStub(latency=0.0),
+        db_latency=args.rtt, jwks_latency=args.rtt, env=env, port=args.port,
+    )
+    latencies = []
+    async with backend:
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        headers = backend.headers()
+        async with backend.client() as http:
+            session_id = None
+            for turn in range(3):
+                request_start = time.perf_counter()
+                response = await http.post("/chat", json={"message": f"answer {turn}", "session_id": session_id}, headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - request_start)
+                session_id = response.json()["session_id"]
+
+    print(json.dumps({
+        "import": eager + backend.import_seconds,
+        "ready": eager + backend.ready_seconds,
+        "first": latencies[0],
+        "steady": statistics.median(latencies[1:]),
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "loaded_at_ready": loaded,
+    }))
+
+
+def run_child(warmup: bool, eager: bool, args) -> dict:
+    command = [sys.executable, "-m", "benchmarks.bench_startup", "--child", "--rtt", str(args.rtt), "--port", str(args.port)]
+    if warmup:
+        command.append("--warmup")
+    if eager:
+        command.append("--eager")
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(args) -> None:
+    variants = [("lazy, no warm-up", False, False), ("lazy, warm-up", True, False)]
+    if args.eager:
+        variants.append(("eager, warm-up", True, True))
+    print(f"{'variant':<18} {'import':>9} {'ready':>9} {'1st /chat':>10} {'steady':>9} {'peak RSS':>9}  heavy modules at ready")
+    for name, warmup, eager in variants:
+        runs = [run_child(warmup, eager, args) for _ in range(args.runs)]
+        median = lambda key: statistics.median(r[key] for r in runs)
+        print(f"{name:<18} {median('import') * 1000:7.0f}ms {median('ready') * 1000:7.0f}ms "
+              f"{median('first') * 1000:8.1f}ms {median('steady') * 1000:7.1f}ms {median('rss_mb'):7.0f}MB  "
+              f"{', '.join(runs[-1]['loaded_at_ready']) or '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--rtt", type=float, default=0.05, help="simulated round trip to Auth0/Supabase")
+    parser.add_argument("--eager", action="store_true", help="also measure importing the heavy SDKs up front")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--warmup", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args))
+    else:
+        main(args)
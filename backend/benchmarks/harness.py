@@ -0,0 +1,132 @@
+"""Serve main.py against the local stubs, for benchmarks that drive it over HTTP."""
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import ExitStack
+
+import httpx
+import uvicorn
+
+from benchmarks.stubs import NO_FAULTS, Auth0Stub, ElevenLabsStub, Faults, GeminiStub, SupabaseStub, jwks_server
+
+
+def configure_main(auth0: Auth0Stub, jwks_url: str, rest_url: str, gemini=None, tts: ElevenLabsStub = None, env: dict = None):
+    """
+    Point main.py at the stubs through the environment (read at import),
+    import it and replace the Gemini and ElevenLabs SDK entry points with
+    ``gemini`` and ``tts``. ``env`` adds or overrides settings. Returns main.
+    """
+    os.environ.update({
+        "AUTH0_DOMAIN": auth0.domain,
+        "AUTH0_AUDIENCE": auth0.audience,
+        "SUPABASE_URL": rest_url,
+        "SUPABASE_KEY": "stub.stub.stub",
+        "GEMINI_API_KEY": "stub",
+        "ELEVENLABS_API_KEY": "stub",
+        "AUDIO_CACHE_DIR": tempfile.mkdtemp(prefix="civicscribe-audio-"),
+        # Nothing to warm or preload: the AI hosts are never contacted
+        "WARMUP": "0",
+        "PRELOAD_AI_SDKS": "0",
+        **(env or {}),
+    })
+    import main
+
+    gemini = gemini or GeminiStub()
+    main.model_for = lambda pack: gemini
+    main.generate = (tts or ElevenLabsStub()).generate
+    main.jwks_store.jwks_url = jwks_url
+    return main
+
+
+class StubbedBackend:
+    """
+    Starts the JWKS and Supabase stub servers, configures main.py for them
+    (``configure_main``) and serves the app with uvicorn on the running event
+    loop::
+
+        async with StubbedBackend(gemini=GeminiStub(latency=0.5)) as backend:
+            async with backend.client() as http:
+                await http.post("/chat", json=..., headers=backend.headers("auth0|a"))
+
+    ``env`` adds settings applied before the import. ``rest_url`` points at a
+    Supabase stub served elsewhere (e.g. another process) instead of ``db``.
+    With ``serve=False`` clients call the app in-process over ASGI. main is
+    imported once per process, so a process runs one StubbedBackend
+    configuration; ``import_seconds`` and ``ready_seconds`` time its import
+    and its startup until serving.
+    """
+
+    def __init__(
+        self,
+        gemini: GeminiStub = None,
+        tts: ElevenLabsStub = None,
+        db: SupabaseStub = None,
+        db_latency=0.0,
+        db_faults: Faults = NO_FAULTS,
+        jwks_latency=0.0,
+        env: dict = None,
+        port: int = 0,
+        rest_url: str = None,
+        serve: bool = True,
+    ):
+        self.auth0 = Auth0Stub()
+        self.gemini = gemini or GeminiStub()
+        self.tts = tts or ElevenLabsStub()
+        self.db = db or SupabaseStub()
+        self.db_latency = db_latency
+        self.db_faults = db_faults
+        self.jwks_latency = jwks_latency
+        self.env = env or {}
+        self.port = port
+        self.rest_url = rest_url
+        self.serve = serve
+        self.main = None
+        self.rest = None
+        self.import_seconds = None
+        self.ready_seconds = None
+        self._stack = ExitStack()
+        self._server = None
+        self._serving = None
+
+    async def __aenter__(self) -> "StubbedBackend":
+        jwks = self._stack.enter_context(jwks_server(self.auth0, latency=self.jwks_latency))
+        if self.rest_url is None:
+            self.rest = self._stack.enter_context(self.db.server(latency=self.db_latency, faults=self.db_faults))
+            self.rest_url = self.rest.url
+        start = time.perf_counter()
+        self.main = configure_main(
+            self.auth0, f"{jwks.url}/.well-known/jwks.json", self.rest_url, self.gemini, self.tts, self.env
+        )
+        self.import_seconds = time.perf_counter() - start
+        if self.serve:
+            self._server = uvicorn.Server(uvicorn.Config(self.main.app, host="127.0.0.1", port=self.port, log_level="warning"))
+            self._serving = asyncio.create_task(self._server.serve())
+            while not self._server.started:
+                if self._serving.done():
+                    self._stack.close()
+                    raise RuntimeError("uvicorn did not start") from self._serving.exception()
+                await asyncio.sleep(0.001)
+        self.ready_seconds = time.perf_counter() - start
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._server is not None:
+            self._server.should_exit = True
+            await self._serving
+        self._stack.close()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def client(self, connections: int = 100) -> httpx.AsyncClient:
+        if not self.serve:
+            # Without lifespan events: startup() and shutdown() do not run
+            return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.main.app), base_url="http://app", timeout=None)
+        limits = httpx.Limits(max_connections=connections)
+        return httpx.AsyncClient(base_url=self.url, timeout=None, limits=limits)
+
+    def headers(self, sub: str = "auth0|stub-user", **claims) -> dict:
+        return {"Authorization": f"Bearer {self.auth0.mint(sub=sub, **claims)}"}
@@ -0,0 +1,94 @@
+"""
+Concurrent /chat load against one uvicorn worker (run in this process), with
+every external service replaced by a local stub of configurable latency.
+
+Run from ``backend/``:
+    python -m benchmarks.load_chat --clients 50 --turns 3 --gemini-latency 0.5 --db-latency 0.02
+
+With ``--stream`` the sessions use ``/chat/stream`` and time-to-first-token
+is reported alongside the full-response latency.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+from benchmarks.harness import StubbedBackend
+from benchmarks.stubs import ElevenLabsStub, GeminiStub
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def client_session(http: httpx.AsyncClient, token: str, turns: int, latencies: list, ttfts: list, stream: bool) -> None:
+    session_id = None
+    headers = {"Authorization": f"Bearer {token}"}
+    for turn in range(turns):
+        payload = {"message": f"My answer number {turn}", "session_id": session_id}
+        start = time.perf_counter()
+        if not stream:
+            response = await http.post("/chat", json=payload, headers=headers)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            session_id = response.json()["session_id"]
+            continue
+
+        async with http.stream("POST", "/chat/stream", json=payload, headers=headers) as response:
+            response.raise_for_status()
+            event, first_token = None, True
+            async for line in response.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: "):
+                    data = json.loads(line[6:])
+                    if event == "session":
+                        session_id = data["session_id"]
+                    elif event == "token" and first_token:
+                        ttfts.append(time.perf_counter() - start)
+                        first_token = False
+                    elif event == "done":
+                        latencies.append(time.perf_counter() - start)
+
+
+async def run(args) -> None:
+    gemini = GeminiStub(latency=args.gemini_latency)
+    tts = ElevenLabsStub(latency=args.tts_latency)
+    latencies: list = []
+    ttfts: list = []
+
+    async with StubbedBackend(gemini=gemini, tts=tts, db_latency=args.db_latency, port=args.port) as backend:
+        tokens = [backend.auth0.mint(sub=f"auth0|load-{i}") for i in range(args.clients)]
+        async with backend.client(connections=args.clients) as http:
+            start = time.perf_counter()
+            await asyncio.gather(*(client_session(http, t, args.turns, latencies, ttfts, args.stream) for t in tokens))
+            elapsed = time.perf_counter() - start
+
+    total = len(latencies)
+    print(f"requests        {total} ({args.clients} clients x {args.turns} turns)")
+    print(f"wall time       {elapsed:.2f} s")
+    print(f"throughput      {total / elapsed:.1f} req/s")
+    print(f"latency p50     {percentile(latencies, 50) * 1000:.0f} ms")
+    print(f"latency p95     {percentile(latencies, 95) * 1000:.0f} ms")
+    print(f"latency p99     {percentile(latencies, 99) * 1000:.0f} ms")
+    print(f"latency mean    {statistics.mean(latencies) * 1000:.0f} ms")
+    if ttfts:
+        print(f"first token p50 {percentile(ttfts, 50) * 1000:.0f} ms")
+        print(f"first token p99 {percentile(ttfts, 99) * 1000:.0f} ms")
+    print(f"upstream calls  gemini={gemini.calls} tts={tts.calls} db={backend.rest.requests}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--stream", action="store_true", help="use /chat/stream (SSE)")
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(run(parser.parse_args()))
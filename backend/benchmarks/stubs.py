@@ -0,0 +1,479 @@
+"""Local stand-ins for the external services the backend talks to."""
+import asyncio
+import itertools
+import json
+import math
+import operator
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# --- Auth0 ---
+
+
+class Auth0Stub:
+    """Mints RS256 tokens and serves the matching JWKS document."""
+
+    def __init__(self, domain: str = "stub.auth0.local", audience: str = "https://stub-api", kid: str = "stub-key"):
+        self.domain = domain
+        self.audience = audience
+        self.kid = kid
+        self._private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self._private_key.public_key()))
+        jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+        self.jwks = {"keys": [jwk]}
+
+    def mint(self, sub: str = "auth0|stub-user", ttl: int = 3600, **extra) -> str:
+        """A signed access token; ``extra`` adds claims (e.g. ``permissions=[...]``)."""
+        now = int(time.time())
+        claims = {
+            "sub": sub,
+            "aud": self.audience,
+            "iss": f"https://{self.domain}/",
+            "iat": now,
+            "exp": now + ttl,
+            **extra,
+        }
+        return jwt.encode(claims, self._private_key, algorithm="RS256", headers={"kid": self.kid})
+
+
+# --- Fault injection ---
+
+
+class Faults:
+    """
+    Fault profile for a stub: each call fails with probability ``error_rate``
+    or stalls for ``hang_latency`` seconds with probability ``hang_rate``.
+    Attributes can be changed mid-run to start or end a brownout.
+    """
+
+    def __init__(self, error_rate: float = 0.0, hang_rate: float = 0.0, hang_latency: float = 30.0, seed=None):
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_latency = hang_latency
+        self.errors = 0
+        self.hangs = 0
+        self._random = random.Random(seed)
+
+    def pick(self):
+        """"error", "hang" or None for the next call."""
+        roll = self._random.random()
+        if roll < self.error_rate:
+            self.errors += 1
+            return "error"
+        if roll < self.error_rate + self.hang_rate:
+            self.hangs += 1
+            return "hang"
+        return None
+
+
+NO_FAULTS = Faults()
+
+
+class Latency:
+    """
+    Latency profile for a stub: lognormal with the given ``median`` and
+    ``p99`` seconds, so a few calls are much slower than most, as with a real
+    service. Without ``p99`` every call takes exactly ``median``.
+    """
+
+    def __init__(self, median: float, p99: float = None, seed=None):
+        self.median = median
+        self.p99 = p99
+        # 2.326 is the standard normal's 99th percentile
+        self._sigma = math.log(p99 / median) / 2.326 if p99 and median and p99 > median else 0.0
+        self._random = random.Random(seed)
+
+    def sample(self) -> float:
+        if not self._sigma:
+            return self.median
+        return self._random.lognormvariate(math.log(self.median), self._sigma)
+
+
+def delay(latency) -> float:
+    """Seconds for one call: ``latency`` is a fixed number or a Latency profile."""
+    return latency.sample() if isinstance(latency, Latency) else latency
+
+
+# --- HTTP server plumbing ---
+
+
+class StubServer:
+    """Runs a routing table of ``(method, path) -> handler`` on a background thread."""
+
+    def __init__(self, routes: dict, latency=0.0, host: str = "127.0.0.1", port: int = 0, faults: Faults = NO_FAULTS):
+        self.routes = routes
+        self.latency = latency
+        self.faults = faults
+        self.requests = 0
+        self.bytes_sent = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out as separate writes; with Nagle on, keep-alive
+            # clients would wait out a delayed ACK (~40 ms) on every request
+            disable_nagle_algorithm = True
+
+            def _dispatch(self, method: str):
+                stub.requests += 1
+                # Read the body even if it goes unused, or it would be parsed
+                # as the next request on this keep-alive connection
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                seconds = delay(stub.latency)
+                if seconds:
+                    time.sleep(seconds)
+                fault = stub.faults.pick()
+                if fault == "error":
+                    self._reply(503, {"error": "injected fault"})
+                    return
+                if fault == "hang":
+                    time.sleep(stub.faults.hang_latency)
+                handler = stub.route(method, self.path.split("?")[0])
+                if handler is None:
+                    self._reply(404, {"error": "not found"})
+                    return
+                # (status, payload) or (status, payload, headers)
+                self._reply(*handler(self, body))
+
+            def _reply(self, status: int, payload, headers: dict = None):
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+                stub.bytes_sent += len(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def route(self, method: str, path: str):
+        """Exact match first, then the longest route ending in "/" that prefixes ``path``."""
+        handler = self.routes.get((method, path))
+        if handler is not None:
+            return handler
+        prefixes = [p for m, p in self.routes if m == method and p.endswith("/") and path.startswith(p)]
+        return self.routes[(method, max(prefixes, key=len))] if prefixes else None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def jwks_server(auth0: Auth0Stub, latency=0.0) -> StubServer:
+    """Serve ``auth0``'s JWKS at ``/.well-known/jwks.json``."""
+    return StubServer({("GET", "/.well-known/jwks.json"): lambda req, body: (200, auth0.jwks)}, latency=latency)
+
+
+# --- Supabase (PostgREST subset) ---
+
+
+class SupabaseStub:
+    """
+    In-memory tables behind the PostgREST calls the backend makes.
+
+    Supports ``eq``/``gt``/``lt`` filters (also inside ``or=(...)`` with
+    nested ``and(...)``, as keyset pagination uses), multi-column ``order``,
+    ``limit``, column projection, ``Prefer: count=exact``, (multi-row)
+    inserts that return the stored rows, and ``on_conflict`` upserts.
+
+    An ``eq`` filter plus ``order`` is served from a cached sorted index, and
+    a keyset condition on the order columns from a bisect of it, so paging
+    costs roughly what it would with the real database's index.
+    """
+
+    def __init__(self):
+        self.tables = {"users": [], "applications": [], "conversation_history": []}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def server(self, latency=0.0, faults: Faults = NO_FAULTS) -> StubServer:
+        return StubServer(
+            {("GET", "/rest/v1/"): self._select, ("POST", "/rest/v1/"): self._insert},
+            latency=latency,
+            faults=faults,
+        )
+
+    @staticmethod
+    def _table_and_query(req):
+        path, _, query = req.path.partition("?")
+        params = [tuple(p.split("=", 1)) for p in query.split("&") if "=" in p]
+        return path.rsplit("/", 1)[-1], [(k, unquote(v)) for k, v in params]
+
+    def _select(self, req, body):
+        table, params = self._table_and_query(req)
+        columns, order, limit, filters = None, [], None, []
+        for key, value in params:
+            if key == "select":
+                columns = None if value == "*" else value.split(",")
+            elif key == "order":
+                order = [term.split(".") for term in value.split(",")]
+            elif key == "limit":
+                limit = int(value)
+            elif key == "or":
+                filters.append(_predicate(f"or{value}"))
+            else:
+                filters.append(_predicate(f"{key}.{value}"))
+        # Plain filters (e.g. application_id=eq.) first: they narrow the most
+        filters.sort(key=lambda f: f.logic)
+        with self._lock:
+            if order and filters and filters[0].op == "eq":
+                rows, keys = self._index(table, filters.pop(0), order)
+            else:
+                rows, keys = self._scan(table, filters, order), None
+        if keys is not None:
+            columns_order = tuple(column for column, *_ in order)
+            descending = ["desc" in direction for _, *direction in order]
+            for f in list(filters):
+                keyset = getattr(f, "keyset", None)
+                if rows and keyset and keyset[0] == columns_order and all(d == (keyset[1] == "lt") for d in descending):
+                    bound = tuple(_sort_key(_typed(rows[0].get(c), v)) for c, v in zip(keyset[0], keyset[2]))
+                    passes = (lambda key: key > bound) if keyset[1] == "gt" else (lambda key: key < bound)
+                    rows = rows[_first(keys, passes):]
+                    filters.remove(f)
+        # Stop filtering once ``limit`` rows matched, like an index scan would,
+        # unless the total is wanted too
+        matching = (r for r in rows if all(f(r) for f in filters))
+        headers = {}
+        if "count=" in (req.headers.get("Prefer") or ""):
+            matching = list(matching)
+            headers["Content-Range"] = f"0-{max(min(len(matching), limit or len(matching)) - 1, 0)}/{len(matching)}"
+        rows = list(itertools.islice(matching, limit))
+        if columns:
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return 200, rows, headers
+
+    def _scan(self, table: str, filters: list, order: list) -> list:
+        rows = list(self.tables.get(table, []))
+        if filters and not filters[0].logic:
+            first = filters.pop(0)
+            rows = [r for r in rows if first(r)]
+        # Stable sorts, least significant column first
+        for column, *direction in reversed(order):
+            rows.sort(key=lambda r: _sort_key(r.get(column)), reverse="desc" in direction)
+        return rows
+
+    def _index(self, table: str, eq, order: list):
+        """Rows matching ``eq`` sorted by ``order``, with their sort keys (rebuilt when the table grows)."""
+        size = len(self.tables.get(table, []))
+        cache_key = (table, eq.column, eq.value, tuple(map(tuple, order)))
+        cached = self._indexes.get(cache_key)
+        if cached is None or cached[0] != size:
+            rows = self._scan(table, [eq], order)
+            keys = [tuple(_sort_key(r.get(column)) for column, *_ in order) for r in rows]
+            cached = self._indexes[cache_key] = (size, rows, keys)
+        return cached[1], cached[2]
+
+    def _insert(self, req, body):
+        table, params = self._table_and_query(req)
+        on_conflict = dict(params).get("on_conflict")
+        payload = json.loads(body or b"[]")
+        rows = payload if isinstance(payload, list) else [payload]
+        stored = []
+        with self._lock:
+            for row in rows:
+                row = dict(row)
+                if on_conflict:
+                    existing = next((r for r in self.tables.get(table, []) if r.get(on_conflict) == row.get(on_conflict)), None)
+                    if existing is not None:
+                        existing.update(row)
+                        stored.append(existing)
+                        continue
+                # uuid keys like the real schema; conversation_history has a bigserial id
+                row.setdefault("id", str(uuid.uuid4()) if table != "conversation_history" else next(self._ids))
+                row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+                self.tables.setdefault(table, []).append(row)
+                stored.append(row)
+        return 201, stored
+
+
+def _sort_key(value):
+    return (0, value, "") if isinstance(value, (int, float)) else (1, 0, str(value or ""))
+
+
+def _typed(sample, value: str):
+    return type(sample)(value) if isinstance(sample, (int, float)) else value
+
+
+def _first(keys: list, passes) -> int:
+    """Index of the first key that ``passes`` (keys that pass all come after those that don't)."""
+    lo, hi = 0, len(keys)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if passes(keys[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _split_terms(text: str) -> list:
+    """Split a PostgREST logic-tree body on its top-level commas."""
+    terms, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and char == "," and depth == 0:
+            terms.append(text[start:i])
+            start = i + 1
+    terms.append(text[start:])
+    return terms
+
+
+def _predicate(term: str):
+    """Compile one filter, ``column.op.value`` or a nested ``and(...)``/``or(...)``, to a row test."""
+    for logic, combine in (("and(", all), ("or(", any)):
+        if term.startswith(logic):
+            parts = [_predicate(t) for t in _split_terms(term[len(logic):-1])]
+            test = lambda row, parts=parts, combine=combine: combine(part(row) for part in parts)
+            test.logic, test.op, test.parts = True, logic[:-1], parts
+            test.keyset = _keyset(test)
+            return test
+    column, op, value = term.split(".", 2)
+    value = value.strip('"')
+    compare = {"eq": operator.eq, "gt": operator.gt, "lt": operator.lt}.get(op)
+    if compare is None:
+        raise ValueError(f"unsupported filter: {term}")
+
+    def test(row):
+        actual = row.get(column)
+        if isinstance(actual, (int, float)):
+            return compare(actual, type(actual)(value))
+        return compare(str(actual), value)
+
+    test.logic, test.op, test.column, test.value = False, op, column, value
+    return test
+
+
+def _keyset(test):
+    """``(columns, op, values)`` if ``test`` is ``a.op.x or (a.eq.x and b.op.y)``, i.e. ``(a, b) op (x, y)``."""
+    if test.op != "or" or len(test.parts) != 2:
+        return None
+    first, rest = test.parts
+    if first.logic or first.op not in ("gt", "lt") or not rest.logic or rest.op != "and" or len(rest.parts) != 2:
+        return None
+    tie, second = rest.parts
+    if tie.logic or second.logic or (tie.op, tie.column, tie.value) != ("eq", first.column, first.value) or second.op != first.op:
+        return None
+    return (first.column, second.column), first.op, (first.value, second.value)
+
+
+# --- Gemini and ElevenLabs ---
+
+
+class _GeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class GeminiStub:
+    """
+    Stands in for ``genai.GenerativeModel``; ``latency`` is seconds or a
+    Latency profile.
+
+    ``reply`` is a string or a function of the request contents. Streamed
+    responses deliver the first chunk after ``first_token_latency`` and
+    spread the rest of ``latency`` over the remaining words.
+    """
+
+    def __init__(
+        self,
+        latency=0.5,
+        reply="Thanks! What is your date of birth?",
+        first_token_latency: float = 0.1,
+        faults: Faults = NO_FAULTS,
+    ):
+        self.latency = latency
+        self.reply = reply
+        self.first_token_latency = first_token_latency
+        self.faults = faults
+        self.calls = 0
+
+    def generate_content(self, contents, **kwargs):
+        self.calls += 1
+        fault = self.faults.pick()
+        if fault == "error":
+            raise ConnectionError("injected fault")
+        time.sleep(delay(self.latency) + (self.faults.hang_latency if fault == "hang" else 0))
+        return _GeminiResponse(self._reply(contents))
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        fault = self.faults.pick()
+        if fault == "error":
+            raise ConnectionError("injected fault")
+        if fault == "hang":
+            await asyncio.sleep(self.faults.hang_latency)
+        if stream:
+            return self._stream(contents)
+        await asyncio.sleep(delay(self.latency))
+        return _GeminiResponse(self._reply(contents))
+
+    def _reply(self, contents) -> str:
+        return self.reply(contents) if callable(self.reply) else self.reply
+
+    async def _stream(self, contents):
+        words = self._reply(contents).split(" ")
+        await asyncio.sleep(self.first_token_latency)
+        gap = max(delay(self.latency) - self.first_token_latency, 0) / max(len(words) - 1, 1)
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(gap)
+            yield _GeminiResponse(word if i == 0 else " " + word)
+
+
+class ElevenLabsStub:
+    """Stands in for ``elevenlabs.generate``: sleeps, then returns silent MP3-ish bytes."""
+
+    def __init__(self, latency=0.3, size: int = 16384, faults: Faults = NO_FAULTS):
+        self.latency = latency
+        self.size = size
+        self.faults = faults
+        self.calls = 0
+
+    def generate(self, text, voice=None, model=None, stream=False, **kwargs):
+        self.calls += 1
+        fault = self.faults.pick()
+        if fault == "error":
+            raise ConnectionError("injected fault")
+        time.sleep(delay(self.latency) + (self.faults.hang_latency if fault == "hang" else 0))
+        audio = b"\xff\xfb" + bytes(self.size - 2)
+        return iter([audio]) if stream else audio
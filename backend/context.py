@@ -0,0 +1,117 @@
+from collections import deque
+from typing import Awaitable, Callable, List, Optional
+
+from cache import TTLCache
+
+# --- Per-session conversation context ---
+
+# Rough token estimate (~4 characters per token for English text).
+CHARS_PER_TOKEN = 4
+
+ROLES = {"user": "user", "ai": "model"}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def is_user_turn(sender: str) -> bool:
+    return ROLES.get(sender, "user") == "user"
+
+
+class ConversationContext:
+    """
+    Rolling window of one session's turns, trimmed to a token budget.
+    ``seen`` counts the session's stored messages the window accounts for.
+    """
+
+    __slots__ = ("token_budget", "turns", "tokens", "user_turns", "seen")
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+        self.turns: deque = deque()
+        self.tokens = 0
+        self.user_turns = 0
+        self.seen = 0
+
+    def append(self, sender: str, message: str) -> None:
+        """
+        Add one turn and drop the oldest turns until the window fits the budget.
+        The window is trimmed at user turns, so it always opens with one
+        (Gemini may reject contents that start with a model reply); the
+        newest user turn and what follows it are always kept, even over budget.
+        """
+        self.seen += 1
+        cost = estimate_tokens(message)
+        self.turns.append((sender, message, cost))
+        self.tokens += cost
+        if is_user_turn(sender):
+            self.user_turns += 1
+        while self.turns and (self.tokens > self.token_budget or not is_user_turn(self.turns[0][0])):
+            # Stop if dropping the front would leave no user turn to open the window
+            if self.user_turns - is_user_turn(self.turns[0][0]) == 0:
+                break
+            self._drop_oldest()
+
+    def _drop_oldest(self) -> None:
+        sender, _, cost = self.turns.popleft()
+        self.tokens -= cost
+        if is_user_turn(sender):
+            self.user_turns -= 1
+
+    def contents(self) -> List[dict]:
+        """The window as Gemini multi-turn contents (consecutive same-role turns merged)."""
+        contents: List[dict] = []
+        for sender, message, _ in self.turns:
+            role = ROLES.get(sender, "user")
+            if contents and contents[-1]["role"] == role:
+                contents[-1]["parts"].append(message)
+            else:
+                contents.append({"role": role, "parts": [message]})
+        return contents
+
+
+class ContextManager:
+    """
+    Keeps recent sessions' contexts in memory (LRU, idle TTL) so each turn is
+    appended incrementally; history is only fetched when a session isn't held
+    or has changed elsewhere.
+
+    With several workers, a turn handled by another worker is missing from
+    this worker's window. ``get`` therefore compares the session's stored
+    message count (``count_messages``) with what the context has seen and
+    rebuilds it on a mismatch. Without ``count_messages`` a held context is
+    trusted, which is only correct with sticky routing (one worker per session).
+    """
+
+    def __init__(self, token_budget: int = 1000, max_sessions: int = 1000, idle_ttl: float = 3600):
+        self.token_budget = token_budget
+        self._contexts = TTLCache(maxsize=max_sessions, ttl=idle_ttl)
+
+    def new(self, session_id: str) -> ConversationContext:
+        context = ConversationContext(self.token_budget)
+        self._contexts.set(session_id, context)
+        return context
+
+    async def get(
+        self,
+        session_id: str,
+        load_history: Callable[[str], Awaitable[list]],
+        count_messages: Optional[Callable[[str], Awaitable[int]]] = None,
+    ) -> ConversationContext:
+        """
+        Return the session's context, rebuilding it from ``load_history`` on a
+        miss or when it is stale. If loading fails the error propagates and
+        nothing is cached, so the next turn tries again.
+        """
+        context = self._contexts.get(session_id)
+        count = await count_messages(session_id) if count_messages is not None else None
+        if context is None or (count is not None and count != context.seen):
+            context = ConversationContext(self.token_budget)
+            for msg in await load_history(session_id):
+                context.append(msg["sender"], msg["message"])
+            if count is not None:
+                context.seen = count
+        # Re-setting refreshes the idle TTL.
+        self._contexts.set(session_id, context)
+        return context
@@ -0,0 +1,127 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from cache import TTLCache
+
+# --- Form field extraction (compiled keyword rules) ---
+
+# A rule is (fields, alternatives): it fills the first still-empty field of
+# ``fields`` with the whole user message when every keyword of any one
+# alternative occurs in it (substring match on the lowercased message). A
+# keyword starting with "^" must be a prefix. Form Packs declare the rules.
+Rule = Tuple[Sequence[str], Sequence[Sequence[str]]]
+
+
+class FieldMatcher:
+    """
+    Field rules compiled for per-message updates: each keyword is tested
+    once per message (not once per rule mentioning it), and only rules
+    mentioning a keyword that was found are evaluated.
+
+    Keywords are plain ``in`` tests: one regex alternation over all of them
+    measured about 4x slower per message at every message length. A full
+    scan of a short history is still about 3x slower than the old if-chain
+    (0.044 vs 0.014 ms at 10 messages, benchmarks/bench_extraction.py); it
+    wins from about 1000 messages, once every field is filled and updates
+    stop. Held sessions are updated one message at a time (a few us each).
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = [(tuple(fields), [frozenset(alt) for alt in alternatives]) for fields, alternatives in rules]
+        self.fields = [field for fields, _ in self.rules for field in fields]
+        keywords = {kw for _, alternatives in self.rules for alt in alternatives for kw in alt}
+        self.prefixes = sorted(kw[1:] for kw in keywords if kw.startswith("^"))
+        self.plain = sorted(kw for kw in keywords if not kw.startswith("^"))
+        self.rules_by_keyword: Dict[str, List[int]] = {}
+        for index, (_, alternatives) in enumerate(self.rules):
+            for kw in set().union(*alternatives):
+                self.rules_by_keyword.setdefault(kw, []).append(index)
+
+    def keywords(self, content: str) -> Set[str]:
+        """All keywords occurring in the lowercased ``content``."""
+        found = {kw for kw in self.plain if kw in content}
+        for prefix in self.prefixes:
+            if content.startswith(prefix):
+                found.add("^" + prefix)
+        return found
+
+    def new_state(self) -> "FormState":
+        return FormState(self)
+
+
+class FormState:
+    """Extracted field values for one session, updated one message at a time."""
+
+    __slots__ = ("matcher", "values", "empty", "messages")
+
+    def __init__(self, matcher: FieldMatcher):
+        self.matcher = matcher
+        self.values = {field: "" for field in matcher.fields}
+        self.empty = len(self.values)
+        self.messages = 0
+
+    def update(self, sender: str, message: str) -> None:
+        self.messages += 1
+        if sender != "user" or not self.empty:
+            return
+        matcher = self.matcher
+        found = matcher.keywords(message.lower())
+        if not found:
+            return
+        candidates = {index for kw in found for index in matcher.rules_by_keyword[kw]}
+        for index in sorted(candidates):
+            fields, alternatives = matcher.rules[index]
+            if any(alt <= found for alt in alternatives):
+                for field in fields:
+                    if not self.values[field]:
+                        self.values[field] = message
+                        self.empty -= 1
+                        break
+
+
+class FormExtractor:
+    """Keeps a FormState per session so extraction never re-scans old messages."""
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl: float = 6 * 3600):
+        self._states = TTLCache(maxsize=max_sessions, ttl=idle_ttl)
+
+    def new(self, session_id: str, matcher: FieldMatcher) -> FormState:
+        state = matcher.new_state()
+        self._states.set(session_id, state)
+        return state
+
+    def observe(self, session_id: str, sender: str, message: str) -> None:
+        """Feed a new message; ignored if the session's state isn't held (it is rebuilt on demand)."""
+        state = self._states.get(session_id)
+        if state is not None:
+            state.update(sender, message)
+
+    async def get(
+        self,
+        session_id: str,
+        matcher: FieldMatcher,
+        iter_history: Callable[[str], AsyncIterator[dict]],
+        count_messages: Optional[Callable[[str], Awaitable[Optional[int]]]] = None,
+    ) -> FormState:
+        """
+        Return the session's state, rebuilding it from ``iter_history`` (streamed,
+        oldest first) on a miss, when it was built with another matcher (e.g.
+        the pack was reloaded) or, with ``count_messages``, when the session has
+        messages this process didn't see (another worker saved them).
+        """
+        state = self._states.get(session_id)
+        count = await count_messages(session_id) if count_messages is not None else None
+        if state is None or state.matcher is not matcher or (count is not None and count != state.messages):
+            state = await self.build(session_id, matcher, iter_history)
+            if state.messages:
+                self._states.set(session_id, state)
+        return state
+
+    @staticmethod
+    async def build(
+        session_id: str, matcher: FieldMatcher, iter_history: Callable[[str], AsyncIterator[dict]]
+    ) -> FormState:
+        """A state built from the full history, without keeping it."""
+        state = matcher.new_state()
+        async for msg in iter_history(session_id):
+            state.update(msg.get("sender"), msg.get("message", ""))
+        return state
@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+try:
+    # libyaml's loader parses pack files several times faster than the pure-Python one
+    from yaml import CSafeLoader as PackLoader
+except ImportError:
+    from yaml import SafeLoader as PackLoader
+
+from extraction import FieldMatcher
+from pdf_template import PageTemplate, compile_template
+
+# --- Form Packs (declarative forms compiled at startup) ---
+
+PACKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "packs")
+PACK_SUFFIXES = (".yaml", ".yml")
+
+# Appended to every pack's prompt; the pack supplies persona, questions and guardrail.
+PROMPT_ACTION = """ACTION:
+1.  Review the conversation so far.
+2.  Acknowledge the user's **LAST ANSWER**.
+3.  Ask the **NEXT** question from the CONVERSATION PLAN.
+4.  Ask **ONE** question per turn.
+"""
+
+
+class FormPackError(ValueError):
+    """A pack file that can't be parsed or fails validation."""
+
+
+class FormPack(NamedTuple):
+    """One compiled form: everything a request needs, built once when the file is loaded."""
+
+    form_type: str
+    name: str
+    version: str
+    prompt: str
+    matcher: FieldMatcher
+    template: PageTemplate
+    filename: str
+    path: str
+
+    @property
+    def pdf_layout(self) -> dict:
+        return self.template.layout
+
+
+def _ordinal(n: int) -> str:
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def build_prompt(persona: str, questions: List[dict], guardrail: str) -> str:
+    """The system instruction: persona, a one-question-per-turn plan, guardrail and action."""
+    n = len(questions)
+    plan = "\n".join(
+        f"{f'{i}.':<3} **{q['topic']}:** {q['ask']}" for i, q in enumerate(questions, 1)
+    )
+    return (
+        f"PERSONA: {persona}\n\n"
+        f"STRICT LIMIT: The conversation must complete the data collection process in a maximum of "
+        f"{n} questions ({n} user answers). After collecting the answer to the {_ordinal(n)} question, "
+        f"immediately move to the final review/output.\n\n"
+        f"CONVERSATION PLAN (Ask ONE question per step):\n{plan}\n\n"
+        f"GUARDRAIL: {guardrail}\n\n"
+        f"{PROMPT_ACTION}"
+    )
+
+
+def _require(mapping, key: str, kind, where: str):
+    value = mapping.get(key) if isinstance(mapping, dict) else None
+    if not isinstance(value, kind) or (isinstance(value, (str, list)) and not value):
+        raise FormPackError(f"{where}: '{key}' is required and must be a non-empty {kind.__name__}")
+    return value
+
+
+def _strings(values, where: str) -> Tuple[str, ...]:
+    if not isinstance(values, list) or not values or not all(isinstance(v, str) and v for v in values):
+        raise FormPackError(f"{where}: expected a non-empty list of strings")
+    return tuple(values)
+
+
+def compile_pack(data: dict, path: str = "<pack>") -> FormPack:
+    """Validate a parsed pack file and compile its prompt, matcher and PDF template."""
+    if not isinstance(data, dict):
+        raise FormPackError(f"{path}: a pack must be a mapping")
+    form_type = _require(data, "form_type", str, path)
+
+    prompt = _require(data, "prompt", dict, path)
+    questions = _require(prompt, "questions", list, f"{path}: prompt")
+    for i, question in enumerate(questions):
+        _require(question, "topic", str, f"{path}: prompt.questions[{i}]")
+        _require(question, "ask", str, f"{path}: prompt.questions[{i}]")
+    prompt_text = build_prompt(
+        _require(prompt, "persona", str, f"{path}: prompt").strip(),
+        questions,
+        _require(prompt, "guardrail", str, f"{path}: prompt").strip(),
+    )
+
+    rules = []
+    fields = set()
+    for i, rule in enumerate(_require(data, "extraction", list, path)):
+        where = f"{path}: extraction[{i}]"
+        rule_fields = _strings(rule.get("fields") if isinstance(rule, dict) else None, f"{where}.fields")
+        duplicate = fields.intersection(rule_fields)
+        if duplicate:
+            raise FormPackError(f"{where}: field {sorted(duplicate)[0]!r} is filled by more than one rule")
+        fields.update(rule_fields)
+        alternatives = []
+        for alternative in _require(rule, "match", list, where):
+            keywords = (alternative,) if isinstance(alternative, str) else _strings(alternative, f"{where}.match")
+            alternatives.append(tuple(kw.lower() for kw in keywords))
+        rules.append((rule_fields, alternatives))
+
+    pdf = dict(_require(data, "pdf", dict, path))
+    filename = pdf.pop("filename", f"{form_type}_Application_Filled.pdf")
+    _require(pdf, "title", str, f"{path}: pdf")
+    pdf.setdefault("footer", "")
+    for i, section in enumerate(_require(pdf, "sections", list, f"{path}: pdf")):
+        where = f"{path}: pdf.sections[{i}]"
+        _require(section, "title", str, where)
+        for j, field in enumerate(_require(section, "fields", list, where)):
+            field_where = f"{where}.fields[{j}]"
+            _require(field, "label", str, field_where)
+            unknown = set(_strings(field.get("keys"), f"{field_where}.keys")) - fields
+            if unknown:
+                raise FormPackError(f"{field_where}: unknown field {sorted(unknown)[0]!r}")
+            if not isinstance(field.get("x"), (int, float)) or field.get("row") not in (0, 1):
+                raise FormPackError(f"{field_where}: 'x' must be a number and 'row' 0 or 1")
+
+    template = compile_template(pdf)
+    version = hashlib.sha256(f"{prompt_text}\0{rules!r}\0{template.version}".encode()).hexdigest()[:16]
+    return FormPack(
+        form_type=form_type.upper(),
+        name=data.get("name") or form_type,
+        version=version,
+        prompt=prompt_text,
+        matcher=FieldMatcher(rules),
+        template=template,
+        filename=filename,
+        path=path,
+    )
+
+
+def load_pack(path: str) -> FormPack:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = yaml.load(f, Loader=PackLoader)
+    except (OSError, yaml.YAMLError) as e:
+        raise FormPackError(f"{path}: {e}") from e
+    return compile_pack(data, path)
+
+
+class FormPackRegistry:
+    """
+    All packs in a directory, compiled once and looked up by ``form_type``.
+
+    A background task polls file mtimes and recompiles only changed files;
+    the lookup table is swapped in whole, so requests never see a half-built
+    registry. A pack that fails to load keeps its previous version.
+    """
+
+    def __init__(self, directory: str, default: str = "SNAP", poll_interval: float = 2.0):
+        self.directory = directory
+        self.default = default.upper()
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self._packs: Dict[str, FormPack] = {}
+        self._files: Dict[str, Tuple[float, Optional[FormPack]]] = {}
+        self._watcher: Optional[asyncio.Task] = None
+
+    def load(self) -> None:
+        """(Re)load every pack file whose mtime changed; raises if the default pack is missing."""
+        self.reload()
+        if self.default not in self._packs:
+            raise FormPackError(f"Default form pack {self.default!r} not found in {self.directory}")
+
+    def reload(self) -> bool:
+        """Pick up added, changed and removed pack files; True if anything changed."""
+        seen = {}
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(PACK_SUFFIXES):
+                seen[entry.path] = entry.stat().st_mtime
+        changed = set(self._files) - set(seen)
+        files = {path: self._files[path] for path in seen if path in self._files}
+        for path, mtime in seen.items():
+            if path in files and files[path][0] == mtime:
+                continue
+            changed.add(path)
+            try:
+                files[path] = (mtime, load_pack(path))
+            except FormPackError as e:
+                print(f"Error loading form pack: {e}")
+                # Keep serving the last good version (if any); retry on the next change.
+                files[path] = (mtime, files.get(path, (None, None))[1])
+        if not changed:
+            return False
+
+        packs: Dict[str, FormPack] = {}
+        for path in sorted(files):
+            pack = files[path][1]
+            if pack is None:
+                continue
+            if pack.form_type in packs:
+                print(f"Error loading form pack: {path}: form_type {pack.form_type!r} is already defined in {packs[pack.form_type].path}")
+                continue
+            packs[pack.form_type] = pack
+        self._files = files
+        self._packs = packs
+        self.reloads += 1
+        return True
+
+    def get(self, form_type: Optional[str] = None) -> Optional[FormPack]:
+        return self._packs.get((form_type or self.default).upper())
+
+    def form_types(self) -> List[str]:
+        return sorted(self._packs)
+
+    def start(self) -> None:
+        """Start polling for changed pack files (needs a running event loop)."""
+        if self._watcher is None and self.poll_interval > 0:
+            self._watcher = asyncio.create_task(self._watch())
+
+    def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                # Compiling is CPU work, but only happens when a file actually changed
+                if self.reload():
+                    print(f"Form packs reloaded: {', '.join(self.form_types())}")
+            except OSError as e:
+                print(f"Error scanning form packs: {e}")
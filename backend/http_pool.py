@@ -0,0 +1,70 @@
+import asyncio
+import importlib.util
+from typing import Iterable, List, Optional
+
+import httpx
+
+from metrics import InstrumentedTransport, Metrics
+
+# --- Shared outbound HTTP connection pool ---
+
+
+class HTTPPool:
+    """
+    One keep-alive connection pool (HTTP/2 where the server negotiates it)
+    shared by every outbound httpx client. Each integration gets a thin
+    ``client`` with its own base URL, headers and timeout on top of the
+    shared transport, so connections and TLS sessions are reused across them.
+    With ``metrics``, every request through the pool is timed by host.
+    """
+
+    def __init__(
+        self,
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 60.0,
+        connect_retries: int = 1,
+        metrics: Optional[Metrics] = None,
+    ):
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("Warning: h2 is not installed; outbound HTTP/2 is disabled")
+            http2 = False
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.transport = httpx.AsyncHTTPTransport(http2=http2, limits=self.limits, retries=connect_retries)
+        if metrics is not None:
+            self.transport = InstrumentedTransport(self.transport, metrics)
+
+    def client(self, base_url: str = "", headers: Optional[dict] = None, timeout: float = 10.0, **kwargs) -> httpx.AsyncClient:
+        """A client on the shared pool (closing the pool closes it too)."""
+        return httpx.AsyncClient(
+            transport=self.transport, base_url=base_url, headers=headers, timeout=timeout, **kwargs
+        )
+
+    async def warm(self, urls: Iterable[str] = (), hosts: Iterable[str] = (), timeout: float = 5.0) -> List[str]:
+        """
+        Open pooled connections (DNS, TCP, TLS) to ``urls`` and resolve
+        ``hosts`` whose SDKs don't use this pool. Returns the failures.
+        """
+        loop = asyncio.get_running_loop()
+        client = self.client(timeout=timeout)
+        urls, hosts = list(urls), list(hosts)
+        results = await asyncio.gather(
+            *(client.head(url) for url in urls),
+            *(loop.getaddrinfo(host, 443) for host in hosts),
+            return_exceptions=True,
+        )
+        # Any HTTP response means the connection is up; only transport errors count.
+        return [
+            f"{target}: {result}"
+            for target, result in zip(urls + hosts, results)
+            if isinstance(result, Exception)
+        ]
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
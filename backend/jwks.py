@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import time
+from typing import Dict, NamedTuple, Optional
+
+import httpx
+import jwt
+
+from cache import TTLCache
+
+# --- Auth0 JWKS key store and verified-token cache ---
+
+# Key types we accept for signature verification (never symmetric "oct" keys),
+# with the algorithm to pin when the JWK doesn't declare one.
+_DEFAULT_ALGS = {"RSA": "RS256", "EC": "ES256", "OKP": "EdDSA"}
+
+
+class SigningKey(NamedTuple):
+    key: object
+    algorithm: str
+
+
+class JWKSKeyStore:
+    """
+    Keeps parsed JWKS public keys indexed by ``kid``.
+
+    Keys are refreshed in the background once they are older than ``ttl``
+    (stale keys keep being served meanwhile). An unknown ``kid`` triggers an
+    immediate refetch, but at most once every ``min_refetch_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        ttl: float = 3600,
+        min_refetch_interval: float = 30,
+        timeout: float = 5.0,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self.client = client
+        self._keys: Dict[str, SigningKey] = {}
+        self._fetched_at = 0.0
+        self._last_attempt = float("-inf")
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def get_key(self, kid: Optional[str]) -> Optional[SigningKey]:
+        """Return the signing key for ``kid``, or None if the JWKS doesn't have it."""
+        if not self._keys:
+            await self.refresh()
+        elif time.monotonic() - self._fetched_at > self.ttl:
+            self._schedule_refresh()
+
+        key = self._keys.get(kid)
+        if key is None and time.monotonic() - self._last_attempt >= self.min_refetch_interval:
+            # Possibly a key rotation: refetch once, rate limited.
+            await self.refresh()
+            key = self._keys.get(kid)
+        return key
+
+    async def refresh(self) -> None:
+        """Fetch and parse the JWKS document, coalescing concurrent callers."""
+        attempt = time.monotonic()
+        async with self._lock:
+            if self._last_attempt >= attempt:
+                return  # Someone else refreshed while we waited for the lock.
+            self._last_attempt = time.monotonic()
+            jwks = await self._fetch()
+            keys = {}
+            for jwk in jwks.get("keys", []):
+                kty = jwk.get("kty")
+                if kty not in _DEFAULT_ALGS or jwk.get("use", "sig") != "sig":
+                    continue
+                try:
+                    algorithm = jwk.get("alg") or _DEFAULT_ALGS[kty]
+                    keys[jwk["kid"]] = SigningKey(jwt.PyJWK(jwk, algorithm).key, algorithm)
+                except (KeyError, jwt.PyJWKError) as e:
+                    print(f"Skipping unusable JWKS key: {e}")
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    async def _fetch(self) -> dict:
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=self.timeout)
+        response = await self.client.get(self.jwks_url)
+        response.raise_for_status()
+        return response.json()
+
+    def _schedule_refresh(self) -> None:
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Keep serving the keys we already have.
+            print(f"Background JWKS refresh failed: {e}")
+
+
+class TokenCache:
+    """Caches decoded claims of verified tokens until their ``exp``."""
+
+    def __init__(self, maxsize: int = 10000, max_ttl: float = 300):
+        self.max_ttl = max_ttl
+        self._cache = TTLCache(maxsize=maxsize)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        return self._cache.get(self._key(token))
+
+    def set(self, token: str, claims: dict) -> None:
+        exp = claims.get("exp")
+        if exp is None:
+            return
+        self._cache.set(self._key(token), claims, ttl=min(exp - time.time(), self.max_ttl))
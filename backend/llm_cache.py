@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+
+# --- Model response cache with request coalescing ---
+
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive form of a message, for cache keys."""
+    return " ".join(text.split()).casefold()
+
+
+class ResponseCache:
+    """
+    LRU/TTL cache of model replies keyed by sha256(prompt version, normalized
+    context window), optionally persisted to a local SQLite file.
+
+    Identical requests in flight at the same time are coalesced: the first
+    caller runs ``compute`` and the others await its result. Failures are
+    never cached. Only windows of at most ``max_turns`` turns are cached
+    (0 = no limit), which keeps the cache to the early turns users share.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        ttl: float = 24 * 3600,
+        max_turns: int = 6,
+        path: Optional[str] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.ttl = ttl
+        self.max_turns = max_turns
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_seconds = 0.0
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_lock = threading.Lock()
+        self._writes = 0
+        self._executor = executor
+        self._owns_executor = False
+        if path:
+            if executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-cache")
+                self._owns_executor = True
+            self._open(maxsize)
+
+    @staticmethod
+    def key(version: str, contents: List[dict]) -> str:
+        window = [[c["role"], [normalize(str(part)) for part in c["parts"]]] for c in contents]
+        return hashlib.sha256(json.dumps([version, window]).encode()).hexdigest()
+
+    def cacheable(self, contents: List[dict]) -> bool:
+        return not self.max_turns or len(contents) <= self.max_turns
+
+    def lookup(self, key: str) -> Optional[str]:
+        """The cached reply for ``key``, or None (counted as a miss: the caller goes upstream)."""
+        reply = self._cached(key)
+        if reply is None:
+            self.misses += 1
+        return reply
+
+    def _cached(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        self.saved_seconds += entry[1]
+        return entry[0]
+
+    def put(self, key: str, reply: str, latency: float) -> None:
+        """Cache ``reply``, which took ``latency`` seconds to generate upstream."""
+        self._entries.set(key, (reply, latency))
+        if self._conn is not None:
+            self._executor.submit(self._persist, key, reply, latency, time.time() + self.ttl)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        """Return the cached reply for ``key``, or join/start the one upstream call for it."""
+        reply = self._cached(key)
+        if reply is not None:
+            return reply
+
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+            reply, latency = await asyncio.shield(task)
+            self.saved_seconds += latency
+            return reply
+
+        self.misses += 1
+        # A separate task, so a cancelled first caller doesn't fail the others.
+        task = asyncio.create_task(self._compute(key, compute))
+        self._pending[key] = task
+        task.add_done_callback(lambda _: self._pending.pop(key, None))
+        reply, _ = await asyncio.shield(task)
+        return reply
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> Tuple[str, float]:
+        start = time.perf_counter()
+        reply = await compute()
+        latency = time.perf_counter() - start
+        self.put(key, reply, latency)
+        return reply, latency
+
+    def stats(self) -> dict:
+        served = self.hits + self.coalesced
+        total = served + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(served / total, 4) if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "size": len(self._entries),
+            "in_flight": len(self._pending),
+        }
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        if self._conn is not None:
+            with self._conn_lock:
+                self._conn.close()
+                self._conn = None
+
+    def _open(self, maxsize: int) -> None:
+        """Open the SQLite file and warm the in-memory LRU from its freshest entries."""
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                reply TEXT NOT NULL,
+                latency REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        now = time.time()
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        rows = conn.execute(
+            "SELECT key, reply, latency, expires_at FROM responses ORDER BY expires_at DESC LIMIT ?", (maxsize,)
+        ).fetchall()
+        # Oldest first, so the freshest entries end up most recently used.
+        for key, reply, latency, expires_at in reversed(rows):
+            self._entries.set(key, (reply, latency), ttl=expires_at - now)
+        self._conn = conn
+
+    def _persist(self, key: str, reply: str, latency: float, expires_at: float) -> None:
+        try:
+            with self._conn_lock:
+                if self._conn is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, reply, latency, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, reply, latency, expires_at),
+                    )
+                    self._writes += 1
+                    if self._writes % 1000 == 0:
+                        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"Error persisting cached response: {e}")
@@ -0,0 +1,340 @@
+import bisect
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import httpx
+
+# --- Latency histograms, Prometheus exposition and slow-request profiling ---
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with one series per label-value tuple.
+    ``observe`` is a dict lookup, a bisect and two additions.
+    """
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def stats_lines(prefix: str, stats: dict) -> List[str]:
+    """
+    Export a nested stats dict as gauges: numbers as values, strings (e.g. a
+    breaker state) as ``{value="..."} 1``. Lists are skipped.
+    """
+    lines = []
+    for key, value in stats.items():
+        name = f"{prefix}_{key}".replace("-", "_")
+        if isinstance(value, dict):
+            lines.extend(stats_lines(name, value))
+        elif isinstance(value, bool):
+            lines.append(f"{name} {int(value)}")
+        elif isinstance(value, (int, float)):
+            lines.append(f"{name} {value}")
+        elif isinstance(value, str):
+            lines.append(f'{name}{{value="{_escape(value)}"}} 1')
+    return lines
+
+
+# --- Per-request traces and the slow-request profiler ---
+
+_request: contextvars.ContextVar = contextvars.ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    """Stage timings (and, when profiled, stack samples) of one request."""
+
+    __slots__ = ("endpoint", "started", "stages", "stacks")
+
+    def __init__(self):
+        self.endpoint = ""
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self.stacks: Optional[Counter] = None
+
+
+class SlowRequestProfiler:
+    """
+    Opt-in sampling profiler for individual slow requests.
+
+    ``sample_rate`` of requests are profiled: while any of them is in flight,
+    a background thread samples the event-loop thread's stack every
+    ``interval`` seconds. A profiled request that takes longer than
+    ``threshold`` seconds is written to ``directory`` as its stage timings
+    plus folded stacks (flamegraph.pl / speedscope format). The loop thread
+    is shared, so the samples include concurrent requests' work.
+    """
+
+    def __init__(self, threshold: float, sample_rate: float = 0.01, interval: float = 0.005, directory: str = "."):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.directory = directory
+        self.reports = 0
+        self._active: List[RequestTrace] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop_thread = 0
+
+    def begin(self, trace: RequestTrace) -> None:
+        if random.random() >= self.sample_rate:
+            return
+        trace.stacks = Counter()
+        if self._thread is None:
+            self._loop_thread = threading.get_ident()
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._sample, name="slow-request-profiler", daemon=True)
+            self._thread.start()
+        with self._lock:
+            self._active.append(trace)
+            self._wakeup.set()
+
+    def end(self, trace: RequestTrace, elapsed: float) -> None:
+        if trace.stacks is None:
+            return
+        with self._lock:
+            self._active.remove(trace)
+        if elapsed >= self.threshold:
+            self._write(trace, elapsed)
+
+    def _sample(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._wakeup.clear()
+                    continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                folded = ";".join(reversed(stack))
+                for trace in active:
+                    trace.stacks[folded] += 1
+            time.sleep(self.interval)
+
+    def _write(self, trace: RequestTrace, elapsed: float) -> None:
+        self.reports += 1
+        path = os.path.join(self.directory, f"slow-{trace.endpoint}-{int(time.time() * 1000)}.txt")
+        lines = [f"# {trace.endpoint} took {elapsed * 1000:.1f} ms"]
+        lines += [f"# stage {name} {seconds * 1000:.1f} ms" for name, seconds in trace.stages]
+        lines += [f"{stack} {count}" for stack, count in trace.stacks.most_common()]
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            print(f"Slow request profiled: {path}")
+        except OSError as e:
+            print(f"Error writing slow request profile: {e}")
+
+
+# --- Instrumentation surface used by the app ---
+
+
+def _otel_tracer(name: str):
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("Warning: opentelemetry-api is not installed; tracing is disabled")
+        return None
+    return trace.get_tracer(name)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("metrics", "name", "started", "span")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+        self.span = None
+
+    def __enter__(self):
+        if self.metrics.tracer is not None:
+            self.span = self.metrics.tracer.start_as_current_span(self.name)
+            self.span.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.metrics.stage_seconds.observe(elapsed, self.name)
+        trace = _request.get()
+        if trace is not None:
+            trace.stages.append((self.name, elapsed))
+        if self.span is not None:
+            self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+class Metrics:
+    """
+    Request and per-stage latency histograms, gauges from registered stats
+    collectors, optional OpenTelemetry spans and the slow-request profiler.
+    With ``enabled`` False every hook is a no-op.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "civicscribe",
+        enabled: bool = True,
+        tracing: bool = False,
+        profiler: Optional[SlowRequestProfiler] = None,
+    ):
+        self.namespace = namespace
+        self.enabled = enabled
+        self.tracer = _otel_tracer(namespace) if tracing else None
+        self.profiler = profiler
+        self.request_seconds = Histogram(
+            f"{namespace}_request_seconds", "HTTP request latency by endpoint and status class", ("endpoint", "status")
+        )
+        self.stage_seconds = Histogram(f"{namespace}_stage_seconds", "Latency of one request stage", ("stage",))
+        self.http_client_seconds = Histogram(
+            f"{namespace}_http_client_seconds", "Outbound HTTP request latency by host", ("host", "status")
+        )
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def stage(self, name: str):
+        """Context manager timing one stage of the current request (and a span, if tracing)."""
+        return _Stage(self, name) if self.enabled else _NULL_STAGE
+
+    def span(self, name: str):
+        """An OpenTelemetry span around an external call, or a no-op."""
+        return self.tracer.start_as_current_span(name) if self.tracer is not None else _NULL_STAGE
+
+    def collector(self, collect: Callable[[], Iterable[str]]) -> None:
+        """Register a function returning extra exposition lines (e.g. from ``stats_lines``)."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = self.request_seconds.render() + self.stage_seconds.render() + self.http_client_seconds.render()
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by endpoint function name and
+    status class, and opening the per-request trace that stages report to.
+    """
+
+    def __init__(self, app, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _request.set(trace)
+        profiler = self.metrics.profiler
+        if profiler is not None:
+            profiler.begin(trace)
+        status = [500]
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - trace.started
+            _request.reset(token)
+            endpoint = scope.get("endpoint")
+            trace.endpoint = getattr(endpoint, "__name__", "unmatched")
+            self.metrics.request_seconds.observe(elapsed, trace.endpoint, f"{status[0] // 100}xx")
+            if profiler is not None:
+                profiler.end(trace, elapsed)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps an httpx transport to time (and optionally trace) every outbound request."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, metrics: Metrics):
+        self.transport = transport
+        self.metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not self.metrics.enabled:
+            return await self.transport.handle_async_request(request)
+        host = request.url.host
+        status = "error"
+        started = time.perf_counter()
+        try:
+            with self.metrics.span(f"HTTP {request.method} {host}"):
+                response = await self.transport.handle_async_request(request)
+            status = f"{response.status_code // 100}xx"
+            return response
+        finally:
+            self.metrics.http_client_seconds.observe(time.perf_counter() - started, host, status)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,13 @@
+-- Keyset pagination of conversation_history (persistence.HistoryReader).
+-- Reads filter on application_id and page on (created_at, id) in either
+-- direction, so this index serves both the recent window and full scans
+-- without touching other applications' rows or sorting.
+--
+-- On a large live table, run the CREATE INDEX on its own with CONCURRENTLY
+-- (outside a transaction) to avoid blocking inserts.
+
+UPDATE conversation_history SET created_at = now() WHERE created_at IS NULL;
+ALTER TABLE conversation_history ALTER COLUMN created_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS conversation_history_application_created_at
+  ON conversation_history (application_id, created_at, id);
@@ -0,0 +1,136 @@
+import hashlib
+import io
+import json
+from typing import Dict, List, Optional, Tuple
+
+# --- Precompiled PDF page templates ---
+
+# reportlab is imported on first render, so loading layouts at startup stays cheap.
+LETTER = (612.0, 792.0)
+
+# A layout has a title, a footer and sections; each section box holds fields
+# placed by column x and row (0 = upper line, 1 = lower line). A field shows
+# its keys' values joined with " / ".
+ROW_OFFSETS = (5, 22)
+VALUE_OFFSET = 160
+SECTION_HEIGHT = 80
+
+
+class PageTemplate:
+    """
+    A one-page summary layout compiled once, on first render.
+
+    Everything static (header band, section boxes, titles, labels, footer) is
+    drawn a single time and kept as a ready-made PDF content stream; each
+    render only registers the fonts and draws the field values on top.
+    """
+
+    def __init__(self, layout: dict, pagesize: Tuple[float, float] = LETTER):
+        self.layout = layout
+        self.pagesize = pagesize
+        self.version = layout_version(layout)
+        self._compiled: Optional[Tuple[str, List[str], List[Tuple[Tuple[str, ...], float, float]]]] = None
+
+    @property
+    def fields(self) -> List[Tuple[Tuple[str, ...], float, float]]:
+        return self.compile()[2]
+
+    def compile(self) -> Tuple[str, List[str], List[Tuple[Tuple[str, ...], float, float]]]:
+        """(static content stream, font names, field positions), drawn once."""
+        # Concurrent first renders may both compile; the results are identical.
+        if self._compiled is None:
+            self._compiled = self._compile()
+        return self._compiled
+
+    def _compile(self) -> Tuple[str, List[str], List[Tuple[Tuple[str, ...], float, float]]]:
+        from reportlab.pdfgen import canvas
+
+        c = canvas.Canvas(io.BytesIO(), pagesize=self.pagesize)
+        fields = []
+        width, height = self.pagesize
+
+        # Header
+        c.setFillColorRGB(0.11, 0.32, 0.91)
+        c.rect(0, height - 70, width, 70, stroke=0, fill=1)
+        c.setFillColorRGB(1, 1, 1)
+        c.setFont("Helvetica-Bold", 20)
+        c.drawString(40, height - 45, self.layout["title"])
+
+        y = height - 90
+        for section in self.layout["sections"]:
+            c.setFillColorRGB(0.95, 0.95, 0.97)
+            c.roundRect(30, y - SECTION_HEIGHT, width - 60, SECTION_HEIGHT, 8, stroke=0, fill=1)
+            c.setFillColorRGB(0.2, 0.2, 0.2)
+            c.setFont("Helvetica-Bold", 12)
+            c.drawString(40, y - 20, section["title"])
+            y -= 30
+            for field in section["fields"]:
+                field_y = y - ROW_OFFSETS[field["row"]]
+                c.setFont("Helvetica", 10)
+                c.setFillColorRGB(0.3, 0.3, 0.3)
+                c.drawString(field["x"], field_y, field["label"])
+                fields.append((tuple(field["keys"]), field["x"] + VALUE_OFFSET, field_y))
+            y -= SECTION_HEIGHT
+
+        # Footer
+        c.setFont("Helvetica-Oblique", 8)
+        c.setFillColorRGB(0.4, 0.4, 0.4)
+        c.drawRightString(width - 30, 30, self.layout["footer"])
+
+        # Font resource names (/F1, /F2, ...) are assigned in registration order,
+        # so renders must register the same fonts in the same order.
+        # _code and _doc.fontMapping are reportlab internals (pinned in
+        # requirements.txt); tests/test_pdf_template.py checks real renders.
+        return "\n".join(c._code), list(c._doc.fontMapping), fields
+
+    def render(self, form_data: dict) -> bytes:
+        from reportlab.pdfgen import canvas
+
+        static_code, fonts, fields = self.compile()
+        buffer = io.BytesIO()
+        c = canvas.Canvas(buffer, pagesize=self.pagesize)
+        for font in fonts:
+            c.setFont(font, 10)
+        c.addLiteral(static_code)
+
+        c.setFont("Helvetica-Bold", 10)
+        c.setFillColorRGB(0.1, 0.1, 0.1)
+        for keys, x, y in fields:
+            value = " / ".join(form_data.get(key, "") for key in keys)
+            c.drawString(x, y, value or "—")
+
+        c.save()
+        return buffer.getvalue()
+
+
+def form_data_key(template: PageTemplate, form_data: dict) -> str:
+    """Cache key for a rendered PDF: template version + extracted values."""
+    payload = json.dumps(form_data, sort_keys=True, ensure_ascii=False).encode()
+    return f"{template.version}:{hashlib.sha256(payload).hexdigest()}"
+
+
+_templates: Dict[str, PageTemplate] = {}
+
+
+def layout_version(layout: dict) -> str:
+    return hashlib.sha256(json.dumps(layout, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def compile_template(layout: dict) -> PageTemplate:
+    """Compile ``layout``, reusing this process's template for an identical layout."""
+    version = layout_version(layout)
+    template = _templates.get(version)
+    if template is None:
+        template = _templates[version] = PageTemplate(layout)
+    return template
+
+
+def render_pdf(form_data: dict, layout: dict, version: Optional[str] = None) -> bytes:
+    """
+    Render ``form_data`` with the process-local compiled template. Module-level
+    so it can run in worker processes, which compile a layout on first use.
+    """
+    template = _templates.get(version) if version else None
+    if template is None:
+        template = compile_template(layout)
+    return template.render(form_data)
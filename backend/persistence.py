@@ -0,0 +1,304 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from context import estimate_tokens
+
+# --- Write-behind persistence for conversation_history ---
+
+
+# PostgreSQL error classes that retrying can't fix: 22 data exception (e.g.
+# 22P02, a malformed uuid) and 23 integrity violation (e.g. 23503, a missing
+# application)
+PERMANENT_SQLSTATE_CLASSES = ("22", "23")
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """
+    Whether a failed insert would fail again: a PostgreSQL data or integrity
+    error, a PostgREST request error or an HTTP 4xx other than 408/429.
+    Anything else (timeouts, connection errors, 5xx) is transient.
+    """
+    code = str(getattr(error, "code", None) or "")
+    if code.startswith("PGRST"):
+        # PGRST0xx: PostgREST couldn't reach the database
+        return not code.startswith("PGRST0")
+    if len(code) == 5:
+        return code[:2] in PERMANENT_SQLSTATE_CLASSES
+    return len(code) == 3 and code.isdigit() and 400 <= int(code) < 500 and int(code) not in (408, 429)
+
+
+def _row_key(row: dict):
+    """Identity of a history row across our buffer and what the DB returns."""
+    created_at = row.get("created_at")
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return created_at, row.get("sender"), row.get("message")
+
+
+class WriteBehindQueue:
+    """
+    Buffers conversation_history rows and writes them as multi-row inserts,
+    flushing when ``max_batch`` rows are queued or ``flush_interval`` seconds
+    have passed.
+
+    A single flusher writes batches in arrival order, so rows of one
+    application are committed in order. Each row gets a client-side,
+    strictly increasing ``created_at`` so the order survives bulk inserts
+    (which would otherwise share one transaction timestamp).
+
+    PostgREST rejects a whole multi-row insert for one bad row, so a batch
+    that fails permanently (``is_permanent``) is bisected until the bad
+    rows are isolated; those are logged and dropped. Transient failures
+    are retried with backoff, at most ``max_retries`` times, after which
+    the batch is dropped too, so one bad batch can't stall every session.
+    """
+
+    def __init__(
+        self,
+        insert: Callable[[List[dict]], Awaitable[None]],
+        max_batch: int = 100,
+        flush_interval: float = 0.2,
+        max_pending: int = 10000,
+        max_retries: int = 8,
+        is_permanent: Callable[[Exception], bool] = is_permanent_error,
+    ):
+        self.insert = insert
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.is_permanent = is_permanent
+        self.flushed_rows = 0
+        self.flushed_batches = 0
+        self.dropped_rows = 0
+        self._queue: List[dict] = []
+        self._in_flight: List[dict] = []
+        # Rows at the front of the in-flight batch already written or dropped
+        self._settled = 0
+        self._by_application: Dict[str, List[dict]] = {}
+        self._last_created_at = datetime.min.replace(tzinfo=timezone.utc)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def put(self, application_id: str, sender: str, message: str) -> None:
+        """Queue one message; only waits if the buffer is full (backpressure)."""
+        if self._flusher is None:
+            self._start()
+        created_at = max(datetime.now(timezone.utc), self._last_created_at + timedelta(microseconds=1))
+        self._last_created_at = created_at
+        row = {
+            "application_id": application_id,
+            "sender": sender,
+            "message": message,
+            "created_at": created_at.isoformat(),
+        }
+        self._queue.append(row)
+        self._by_application.setdefault(application_id, []).append(row)
+        if self._closed:
+            await self.flush()
+        elif len(self._queue) >= self.max_pending:
+            await self.flush()
+        elif len(self._queue) >= self.max_batch:
+            self._wakeup.set()
+
+    def pending(self, application_id: str) -> List[dict]:
+        """Rows for ``application_id`` that may not be committed yet, oldest first."""
+        return list(self._by_application.get(application_id, ()))
+
+    def overlay(self, application_id: str, fetched: List[dict]) -> List[dict]:
+        """Append not-yet-committed rows to rows fetched from the DB (read-your-writes)."""
+        pending = self.pending(application_id)
+        if not pending:
+            return fetched
+        seen = {_row_key(row) for row in fetched}
+        return fetched + [row for row in pending if _row_key(row) not in seen]
+
+    async def flush(self) -> None:
+        """Write everything queued so far, in order."""
+        async with self._flush_lock:
+            while self._queue:
+                batch = self._queue[:self.max_batch]
+                del self._queue[:len(batch)]
+                self._in_flight = batch
+                self._settled = 0
+                try:
+                    await self._write(batch)
+                except asyncio.CancelledError:
+                    # Put back only the rows not yet written (bisection settles
+                    # the batch front to back) so a later flush, e.g. drain,
+                    # writes them without repeating the committed ones.
+                    self._forget(batch[:self._settled])
+                    self._queue[:0] = batch[self._settled:]
+                    raise
+                finally:
+                    self._in_flight = []
+                self._forget(batch)
+
+    async def drain(self, timeout: float = 10) -> None:
+        """Stop the flusher and write out everything still buffered."""
+        self._closed = True
+        if self._flusher is None:
+            return
+        self._flusher.cancel()
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            lost = len(self._queue) + len(self._in_flight)
+            print(f"Error draining message queue: {lost} messages were not saved")
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue) + len(self._in_flight),
+            "flushed_rows": self.flushed_rows,
+            "flushed_batches": self.flushed_batches,
+            "dropped_rows": self.dropped_rows,
+        }
+
+    def _start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _write(self, batch: List[dict]) -> None:
+        """Insert one batch: retry transient errors, bisect permanent ones down to the bad rows."""
+        attempt = 0
+        while True:
+            try:
+                await self.insert(batch)
+                self.flushed_rows += len(batch)
+                self.flushed_batches += 1
+                self._settled += len(batch)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.is_permanent(e):
+                    error = e
+                    break
+                print(f"Error saving messages (batch of {len(batch)}, attempt {attempt + 1}): {e}")
+                attempt += 1
+                if attempt > self.max_retries:
+                    self._drop(batch, e)
+                    return
+                await asyncio.sleep(min(0.1 * 2 ** (attempt - 1), 5))
+        if len(batch) == 1:
+            self._drop(batch, error)
+            return
+        # Halves in order, so the good rows are still committed in arrival order
+        middle = len(batch) // 2
+        await self._write(batch[:middle])
+        await self._write(batch[middle:])
+
+    def _drop(self, rows: List[dict], error: Exception) -> None:
+        self.dropped_rows += len(rows)
+        self._settled += len(rows)
+        applications = sorted({str(row["application_id"]) for row in rows})
+        print(f"Error saving messages: dropped {len(rows)} for application(s) {', '.join(applications)}: {error}")
+
+    def _forget(self, batch: List[dict]) -> None:
+        for row in batch:
+            # Batches leave in arrival order, so the row is first in its application's list.
+            rows = self._by_application.get(row["application_id"])
+            if rows:
+                rows.pop(0)
+                if not rows:
+                    del self._by_application[row["application_id"]]
+
+
+# --- Windowed and keyset-paginated conversation_history reads ---
+
+# The columns the app reads; ``id`` is the keyset tie-breaker.
+HISTORY_COLUMNS = "id,sender,message,created_at"
+
+
+class HistoryReader:
+    """
+    Reads one application's conversation_history in pages with keyset
+    pagination on (created_at, id), which the (application_id, created_at,
+    id) index serves without scanning the application's older rows (see
+    migrations/). Rows still queued in ``writer`` are appended, so reads
+    see this process's own writes.
+    """
+
+    def __init__(self, table: Callable[[], Any], writer: WriteBehindQueue, page_size: int = 500):
+        self.table = table
+        self.writer = writer
+        self.page_size = page_size
+        self.pages = 0
+        self.rows = 0
+
+    async def recent(self, application_id: str, max_rows: int, token_budget: Optional[int] = None) -> List[dict]:
+        """
+        The newest rows, oldest first: at most ``max_rows``, and no more
+        pages than needed to cover ``token_budget`` estimated tokens.
+        """
+        rows: List[dict] = []
+        tokens = 0
+        cursor = None
+        while len(rows) < max_rows:
+            limit = min(self.page_size, max_rows - len(rows))
+            page = await self._page(application_id, limit, cursor, desc=True)
+            rows.extend(page)
+            tokens += sum(estimate_tokens(row["message"]) for row in page)
+            if len(page) < limit or (token_budget is not None and tokens >= token_budget):
+                break
+            cursor = page[-1]
+        rows.reverse()
+        return self.writer.overlay(application_id, rows)
+
+    async def iterate(self, application_id: str) -> AsyncIterator[dict]:
+        """Every row, oldest first, holding one page in memory at a time."""
+        pending = self.writer.pending(application_id)
+        # Pending rows may be flushed mid-read and show up in a later page.
+        first_pending = _row_key(pending[0])[0] if pending else None
+        seen = set()
+        cursor = None
+        while True:
+            page = await self._page(application_id, self.page_size, cursor)
+            for row in page:
+                if first_pending is not None:
+                    key = _row_key(row)
+                    if key[0] >= first_pending:
+                        seen.add(key)
+                yield row
+            if len(page) < self.page_size:
+                break
+            cursor = page[-1]
+        for row in pending:
+            if _row_key(row) not in seen:
+                yield row
+
+    def stats(self) -> dict:
+        return {"pages": self.pages, "rows": self.rows}
+
+    async def _page(self, application_id: str, limit: int, cursor: Optional[dict] = None, desc: bool = False) -> List[dict]:
+        """One page after (or, with ``desc``, before) the ``cursor`` row."""
+        direction = ".desc" if desc else ""
+        # PostgREST takes a multi-column order as one comma-separated value
+        query = (
+            self.table()
+            .select(HISTORY_COLUMNS)
+            .eq("application_id", application_id)
+            .order(f"created_at{direction},id", desc=desc)
+            .limit(limit)
+        )
+        if cursor is not None:
+            op = "lt" if desc else "gt"
+            created_at = f'"{cursor["created_at"]}"'
+            query = query.or_(f"created_at.{op}.{created_at},and(created_at.eq.{created_at},id.{op}.{cursor['id']})")
+        result = await query.execute()
+        self.pages += 1
+        self.rows += len(result.data)
+        return result.data
@@ -0,0 +1,320 @@
+import asyncio
+import contextvars
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, Optional, Tuple, Type
+
+# --- Resilience layer for outbound calls (Gemini, ElevenLabs) ---
+
+# Monotonic time by which the current request must be answered (None = no deadline).
+_deadline: contextvars.ContextVar = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """Bound every guarded call made inside the block (and tasks it spawns) to ``seconds`` from now."""
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def clear_deadline() -> None:
+    """Detach the current task from the request deadline (for background work that outlives it)."""
+    _deadline.set(None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current request's deadline, or None if it has none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class UpstreamUnavailable(Exception):
+    """A guarded call was not attempted or given up on: breaker open, queue full or deadline spent."""
+
+
+class DeadlineExceeded(UpstreamUnavailable, asyncio.TimeoutError):
+    """An attempt timed out early because the request deadline, not the provider's timeout, ran out."""
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """The HTTP status an SDK error carries (``code``, ``status_code`` or ``response.status_code``), if any."""
+    for value in (
+        getattr(error, "code", None),
+        getattr(error, "status_code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+    ):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_upstream_fault(error: BaseException) -> bool:
+    """
+    Whether ``error`` says the provider itself is in trouble: a timeout, a
+    connection error, or a 429 or 5xx response. Client errors (a 400 for an
+    invalid argument, say) and our own limits and deadline are not.
+    """
+    if isinstance(error, UpstreamUnavailable):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = status_code(error)
+    return status is not None and (status == 429 or status >= 500)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failed calls and fails fast
+    for ``reset_timeout`` seconds; then lets one probe call through
+    (half-open), which closes it on success or reopens it on failure. A
+    probe that never reports back is replaced after another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def available(self) -> bool:
+        """Whether a call may go upstream now."""
+        state = self.state
+        if state == "closed":
+            return True
+        return state == "half-open" and (
+            self._probe_at is None or time.monotonic() - self._probe_at >= self.reset_timeout
+        )
+
+    def allow(self) -> bool:
+        """Like ``available``, but claims the probe when half-open."""
+        if not self.available():
+            return False
+        if self._opened_at is not None:
+            self._probe_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._probe_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probe_at is not None or (self._opened_at is None and self.failures >= self.failure_threshold):
+            if self._probe_at is None:
+                self.opened += 1
+            self._opened_at = time.monotonic()
+            self._probe_at = None
+
+
+class Upstream:
+    """
+    Guards calls to one external provider: at most ``max_concurrency`` in
+    flight, at most ``max_queue`` waiting (more are rejected), each attempt
+    bounded by ``timeout`` and the request deadline, transient failures
+    (``retry_on`` types, or errors ``retry_if`` accepts) retried with
+    full-jitter exponential backoff, and a circuit breaker that fails fast
+    while the provider is down. Only transient errors and upstream faults
+    (``is_upstream_fault``) count towards opening the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 16,
+        max_queue: int = 64,
+        timeout: float = 30.0,
+        retries: int = 2,
+        backoff: float = 0.2,
+        max_backoff: float = 2.0,
+        retry_on: Tuple[Type[BaseException], ...] = (asyncio.TimeoutError, ConnectionError),
+        retry_if: Optional[Callable[[BaseException], bool]] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_on = retry_on
+        self.retry_if = retry_if
+        self.breaker = breaker or CircuitBreaker()
+        self.in_flight = 0
+        self.queued = 0
+        self.calls = 0
+        self.rejected = 0
+        self.short_circuited = 0
+        self.timeouts = 0
+        self.retried = 0
+        self.failed = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def available(self) -> bool:
+        """False while the breaker is open (callers can skip straight to a fallback)."""
+        return self.breaker.available()
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one concurrency slot for the block, e.g. a streamed response.
+        The block's outcome is recorded on the breaker; it is not retried.
+        A block abandoned by its consumer (cancelled, or a generator closed
+        when the client disconnects) is not recorded.
+        """
+        self.calls += 1
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise UpstreamUnavailable(f"{self.name}: circuit open")
+        await self._acquire()
+        try:
+            yield
+        except BaseException as e:
+            if not isinstance(e, (asyncio.CancelledError, GeneratorExit)):
+                self._record_failure(e)
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def call(self, func: Callable[..., Awaitable], *args):
+        """Run ``func(*args)`` under the limits, retrying transient failures."""
+        self.calls += 1
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise UpstreamUnavailable(f"{self.name}: circuit open")
+        await self._acquire()
+        try:
+            attempt = 0
+            fault = None
+            while True:
+                try:
+                    timeout = self.attempt_timeout()
+                    result = await self.wait(func(*args), timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if not isinstance(e, UpstreamUnavailable):
+                        fault = e
+                    delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                    left = remaining()
+                    if (
+                        not self._retryable(e)
+                        or attempt >= self.retries
+                        or (left is not None and left <= delay)
+                    ):
+                        # A retry cut short by the deadline still reports the provider's earlier failure
+                        self._record_failure(fault or e)
+                        raise
+                    attempt += 1
+                    self.retried += 1
+                    await asyncio.sleep(delay)
+                else:
+                    self.breaker.record_success()
+                    return result
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def wait(self, awaitable, timeout: Optional[float] = None):
+        """
+        Await one attempt bounded by ``timeout`` (default ``attempt_timeout``).
+        A timeout cut short by the request deadline raises DeadlineExceeded,
+        which is not held against the provider.
+        """
+        if timeout is None:
+            try:
+                timeout = self.attempt_timeout()
+            except UpstreamUnavailable:
+                if asyncio.iscoroutine(awaitable):
+                    awaitable.close()
+                raise
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            if timeout < self.timeout:
+                raise DeadlineExceeded(f"{self.name}: request deadline exceeded") from None
+            raise
+
+    async def iterate(self, chunks):
+        """Yield from an async iterable (a streamed response), bounding the wait for each item."""
+        iterator = chunks.__aiter__()
+        while True:
+            try:
+                yield await self.wait(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "short_circuited": self.short_circuited,
+            "timeouts": self.timeouts,
+            "retried": self.retried,
+            "failed": self.failed,
+            "breaker_opened": self.breaker.opened,
+        }
+
+    def attempt_timeout(self) -> float:
+        """Timeout for one attempt: ``timeout``, cut short by the request deadline."""
+        left = remaining()
+        if left is None:
+            return self.timeout
+        if left <= 0:
+            raise DeadlineExceeded(f"{self.name}: request deadline exceeded")
+        return min(self.timeout, left)
+
+    async def _acquire(self) -> None:
+        """Take a concurrency slot, waiting no longer than the request deadline."""
+        if self._semaphore.locked():
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise UpstreamUnavailable(f"{self.name}: too many queued calls")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), remaining())
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise UpstreamUnavailable(f"{self.name}: request deadline exceeded while queued") from None
+            finally:
+                self.queued -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+
+    def _retryable(self, error: BaseException) -> bool:
+        if isinstance(error, UpstreamUnavailable):
+            return False
+        return isinstance(error, self.retry_on) or (self.retry_if is not None and self.retry_if(error))
+
+    def _record_failure(self, error: BaseException) -> None:
+        self.failed += 1
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+        if self._retryable(error) or is_upstream_fault(error):
+            self.breaker.record_failure()
+        elif not isinstance(error, UpstreamUnavailable):
+            # The provider answered; the request was at fault
+            self.breaker.record_success()
+        # Our own limits and deadline say nothing about the provider
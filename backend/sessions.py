@@ -0,0 +1,270 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+# --- Session stores (conversation history without Supabase) ---
+
+# Approximate per-message bookkeeping cost on top of the text itself.
+MESSAGE_OVERHEAD_BYTES = 120
+
+
+class Message:
+    """One stored chat message."""
+
+    __slots__ = ("sender", "message")
+
+    def __init__(self, sender: str, message: str):
+        self.sender = sender
+        self.message = message
+
+    def to_dict(self) -> dict:
+        return {"sender": self.sender, "message": self.message}
+
+
+class SessionStore(ABC):
+    """Interface for storing application sessions and their conversation history."""
+
+    @abstractmethod
+    async def create_session(self, session_id: str, user_id: str, form_type: str) -> None:
+        ...
+
+    @abstractmethod
+    async def append(self, session_id: str, sender: str, message: str) -> None:
+        ...
+
+    @abstractmethod
+    async def history(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        """The session's messages, oldest first (only the newest ``limit``, if given)."""
+
+    @abstractmethod
+    async def form_type(self, session_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def count(self, session_id: str) -> int:
+        """Number of messages stored for the session."""
+
+    def close(self) -> None:
+        pass
+
+
+class _Session:
+    __slots__ = ("user_id", "form_type", "messages", "size", "last_used")
+
+    def __init__(self, user_id: Optional[str], form_type: Optional[str]):
+        self.user_id = user_id
+        self.form_type = form_type
+        self.messages: List[Message] = []
+        self.size = MESSAGE_OVERHEAD_BYTES
+        self.last_used = time.monotonic()
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process store with LRU eviction, an idle TTL and a memory cap.
+    Sessions are kept in last-used order, so both expiry and eviction pop
+    from the front.
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl: float = 6 * 3600, max_bytes: int = 256 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    async def create_session(self, session_id: str, user_id: str, form_type: str) -> None:
+        with self._lock:
+            self._use(session_id, user_id, form_type)
+            self._evict()
+
+    async def append(self, session_id: str, sender: str, message: str) -> None:
+        with self._lock:
+            session = self._use(session_id)
+            session.messages.append(Message(sender, message))
+            cost = len(message) + MESSAGE_OVERHEAD_BYTES
+            session.size += cost
+            self._bytes += cost
+            self._evict()
+
+    async def history(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            messages = session.messages[-limit:] if limit else session.messages
+            return [m.to_dict() for m in messages]
+
+    async def form_type(self, session_id: str) -> Optional[str]:
+        session = self._sessions.get(session_id)
+        return session.form_type if session else None
+
+    async def count(self, session_id: str) -> int:
+        session = self._sessions.get(session_id)
+        return len(session.messages) if session else 0
+
+    def stats(self) -> dict:
+        return {"sessions": len(self._sessions), "bytes": self._bytes, "evictions": self.evictions}
+
+    def _use(self, session_id: str, user_id: Optional[str] = None, form_type: Optional[str] = None) -> _Session:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session(user_id, form_type)
+            self._bytes += session.size
+        else:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.idle_ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used > cutoff:
+                break
+            self._pop_oldest()
+
+    def _evict(self) -> None:
+        self._expire()
+        # Never evict the session that was just used (it is last in order).
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            self._pop_oldest()
+
+    def _pop_oldest(self) -> None:
+        _, session = self._sessions.popitem(last=False)
+        self._bytes -= session.size
+        self.evictions += 1
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    On-disk store in a WAL-mode SQLite file, shareable by several uvicorn
+    workers on one host. Queries run on a small dedicated thread pool.
+    """
+
+    def __init__(self, path: str, idle_ttl: float = 7 * 24 * 3600, max_workers: int = 4):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="session-store")
+        self._writes = 0
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_id TEXT,
+                    form_type TEXT,
+                    last_used REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    sender TEXT NOT NULL,
+                    message TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS messages_session_id ON messages (session_id, id);
+                CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used);
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def create_session(self, session_id: str, user_id: str, form_type: str) -> None:
+        await self._run(self._create_session, session_id, user_id, form_type)
+
+    async def append(self, session_id: str, sender: str, message: str) -> None:
+        await self._run(self._append, session_id, sender, message)
+
+    async def history(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        return await self._run(self._history, session_id, limit)
+
+    async def form_type(self, session_id: str) -> Optional[str]:
+        return await self._run(self._form_type, session_id)
+
+    async def count(self, session_id: str) -> int:
+        return await self._run(self._count, session_id)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _create_session(self, session_id: str, user_id: str, form_type: str) -> None:
+        self._connect().execute(
+            "INSERT OR IGNORE INTO sessions (session_id, user_id, form_type, last_used) VALUES (?, ?, ?, ?)",
+            (session_id, user_id, form_type, time.time()),
+        )
+
+    def _append(self, session_id: str, sender: str, message: str) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO sessions (session_id, last_used) VALUES (?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET last_used = excluded.last_used",
+                (session_id, time.time()),
+            )
+            conn.execute(
+                "INSERT INTO messages (session_id, sender, message) VALUES (?, ?, ?)",
+                (session_id, sender, message),
+            )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._expire(conn)
+
+    def _history(self, session_id: str, limit: Optional[int] = None) -> List[dict]:
+        if limit:
+            rows = self._connect().execute(
+                "SELECT sender, message FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?", (session_id, limit)
+            ).fetchall()
+            rows.reverse()
+        else:
+            rows = self._connect().execute(
+                "SELECT sender, message FROM messages WHERE session_id = ? ORDER BY id", (session_id,)
+            ).fetchall()
+        return [{"sender": sender, "message": message} for sender, message in rows]
+
+    def _form_type(self, session_id: str) -> Optional[str]:
+        row = self._connect().execute("SELECT form_type FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def _count(self, session_id: str) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def _expire(self, conn: sqlite3.Connection) -> None:
+        cutoff = time.time() - self.idle_ttl
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE last_used < ?)",
+                (cutoff,),
+            )
+            conn.execute("DELETE FROM sessions WHERE last_used < ?", (cutoff,))
+
+
+def create_session_store(kind: str = "memory", path: Optional[str] = None, **options) -> SessionStore:
+    """Build the session store named by ``kind`` ("memory" or "sqlite")."""
+    if kind == "memory":
+        return MemorySessionStore(**options)
+    if kind == "sqlite":
+        return SQLiteSessionStore(path or os.path.join(os.getcwd(), "sessions.db"), **options)
+    raise ValueError(f"Unknown session store: {kind}")
@@ -0,0 +1,22 @@
+import os
+import time
+
+from audio import STALE_PART_SECONDS, AudioCache
+
+
+def test_startup_removes_only_stale_partial_files(tmp_path):
+    (tmp_path / "a.mp3").write_bytes(b"x" * 10)
+    writing = tmp_path / "b.mp3.123.456.part"
+    writing.write_bytes(b"y")
+    stale = tmp_path / "c.mp3.123.789.part"
+    stale.write_bytes(b"z")
+    old = time.time() - STALE_PART_SECONDS - 60
+    os.utime(stale, (old, old))
+
+    cache = AudioCache(str(tmp_path), synthesize=lambda *args: [], executor=None)
+
+    # Another worker may still be writing the recent one
+    assert writing.exists()
+    assert not stale.exists()
+    assert cache._touch("a")
+    assert not cache._touch("b")
@@ -0,0 +1,42 @@
+import asyncio
+import csv
+import io
+import zipfile
+
+from fastapi import HTTPException
+
+from batch_export import export_zip
+
+
+def run_export(session_ids, build) -> zipfile.ZipFile:
+    async def collect():
+        return b"".join([chunk async for chunk in export_zip(session_ids, build, concurrency=2)])
+
+    return zipfile.ZipFile(io.BytesIO(asyncio.run(collect())))
+
+
+def manifest(archive: zipfile.ZipFile) -> dict:
+    rows = list(csv.reader(io.StringIO(archive.read("manifest.csv").decode())))
+    assert rows[0] == ["session_id", "file", "status"]
+    return {session_id: (file, status) for session_id, file, status in rows[1:]}
+
+
+def test_manifest_gives_the_reason_a_session_failed():
+    async def build(session_id):
+        if session_id == "bogus":
+            raise HTTPException(status_code=404, detail="Session not found")
+        if session_id == "empty":
+            raise LookupError("No conversation found for this session")
+        if session_id == "broken":
+            raise RuntimeError()
+        return f"{session_id}.pdf", b"%PDF"
+
+    archive = run_export(["a", "bogus", "empty", "broken", "b"], build)
+    assert manifest(archive) == {
+        "a": ("a.pdf", "ok"),
+        "bogus": ("", "error: Session not found"),
+        "empty": ("", "error: No conversation found for this session"),
+        "broken": ("", "error: RuntimeError"),
+        "b": ("b.pdf", "ok"),
+    }
+    assert sorted(archive.namelist()) == ["a.pdf", "b.pdf", "manifest.csv"]
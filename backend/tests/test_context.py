@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from context import ConversationContext, estimate_tokens
+
+
+def random_text(rng: random.Random) -> str:
+    return "x" * rng.choice([3, 40, 200, 600, 2000])
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_window_opens_with_a_user_turn_after_trimming(seed):
+    rng = random.Random(seed)
+    context = ConversationContext(token_budget=rng.choice([50, 200, 1000]))
+    trimmed = 0
+    for _ in range(200):
+        context.append("user", random_text(rng))
+        # A user message sometimes goes unanswered (the reply failed to save)
+        if rng.random() < 0.9:
+            context.append("ai", random_text(rng))
+        trimmed += context.seen > len(context.turns)
+        contents = context.contents()
+        assert contents[0]["role"] == "user"
+        assert context.tokens == sum(cost for _, _, cost in context.turns)
+        assert context.user_turns == sum(sender == "user" for sender, _, _ in context.turns)
+    assert trimmed
+
+
+def test_keeps_the_newest_exchange_over_budget():
+    context = ConversationContext(token_budget=10)
+    context.append("user", "short")
+    context.append("ai", "short")
+    context.append("user", "a question")
+    context.append("ai", "y" * 400)
+    assert [sender for sender, _, _ in context.turns] == ["user", "ai"]
+    assert context.contents()[0] == {"role": "user", "parts": ["a question"]}
+
+
+def test_trims_whole_exchanges_within_budget():
+    context = ConversationContext(token_budget=3 * estimate_tokens("x" * 20))
+    for i in range(4):
+        context.append("user", f"{i}" * 20)
+        context.append("ai", f"{i}" * 20)
+    # Dropping only the oldest turn would leave a model reply first
+    assert [message[0] for _, message, _ in context.turns] == ["3", "3"]
+
+
+def test_leading_model_turn_from_history_is_dropped():
+    context = ConversationContext(token_budget=1000)
+    context.append("ai", "Hello! What is your name?")
+    context.append("user", "Jane")
+    assert context.contents() == [{"role": "user", "parts": ["Jane"]}]
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import random
+
+import pytest
+
+from extraction import FormExtractor
+from form_packs import PACKS_DIR, load_pack
+
+SNAP_MATCHER = load_pack(os.path.join(PACKS_DIR, "snap.yaml")).matcher
+TRACES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "traces", "snap_conversations.json")
+
+# Every keyword of the old chain, plus near misses and filler
+FRAGMENTS = [
+    "state", "language", "english", "spanish", "full name", "name is", "name", "dob", "birth",
+    "phone", "number", "email", "address", "household", "size", "member 1", "first member",
+    "member 2", "second member", "ssn", "last 4", "citizen", "residen", "immigrant", "employ",
+    "income", "gross", "amount", "other", "rent", "mortgage", "utility", "utilities", "asset",
+    "bank", "cash", "member", "first", "last", "4", "nam", "emai", "house", "hold",
+    "Texas", "yes", "no", "my", "is", "$1,200", "2015-06-01", ",", ".", ":",
+]
+
+
+def legacy_extract(conversation_history: list) -> dict:
+    """The keyword chain extraction used before the compiled matcher (demo defaults removed)."""
+    form_data = {field: "" for field in SNAP_MATCHER.fields}
+    for msg in conversation_history:
+        if msg.get("sender") != "user":
+            continue
+        raw = msg.get("message", "")
+        content = raw.lower()
+        if "state" in content and not form_data["state"]:
+            form_data["state"] = raw
+        if ("language" in content or "english" in content or "spanish" in content) and not form_data["language"]:
+            form_data["language"] = raw
+        if ("full name" in content or "name is" in content or content.startswith("name")) and not form_data["full_name"]:
+            form_data["full_name"] = raw
+        if ("dob" in content or "birth" in content) and not form_data["dob"]:
+            form_data["dob"] = raw
+        if ("phone" in content or "number" in content) and not form_data["phone"]:
+            form_data["phone"] = raw
+        if "email" in content and not form_data["email"]:
+            form_data["email"] = raw
+        if "address" in content and not form_data["address"]:
+            form_data["address"] = raw
+        if ("household" in content and "size" in content) and not form_data["household_size"]:
+            form_data["household_size"] = raw
+        if ("member 1" in content or "first member" in content) and not form_data["member1"]:
+            form_data["member1"] = raw
+        if ("member 2" in content or "second member" in content) and not form_data["member2"]:
+            form_data["member2"] = raw
+        if ("ssn" in content or "last 4" in content) and not form_data["ssn_last4"]:
+            form_data["ssn_last4"] = raw
+        if ("citizen" in content or "residen" in content or "immigrant" in content) and not form_data["citizenship"]:
+            form_data["citizenship"] = raw
+        if ("employ" in content) and not form_data["employment"]:
+            form_data["employment"] = raw
+        if ("income" in content and ("gross" in content or "amount" in content)) and not form_data["income"]:
+            form_data["income"] = raw
+        if ("other" in content and "income" in content) and not form_data["other_income1"]:
+            form_data["other_income1"] = raw
+        elif ("other" in content and "income" in content) and not form_data["other_income2"]:
+            form_data["other_income2"] = raw
+        if ("rent" in content or "mortgage" in content) and not form_data["rent"]:
+            form_data["rent"] = raw
+        if ("utility" in content or "utilities" in content) and not form_data["utilities"]:
+            form_data["utilities"] = raw
+        if ("asset" in content or "bank" in content or "cash" in content) and not form_data["assets"]:
+            form_data["assets"] = raw
+    return form_data
+
+
+def compiled_extract(conversation_history: list) -> dict:
+    state = SNAP_MATCHER.new_state()
+    for msg in conversation_history:
+        state.update(msg["sender"], msg["message"])
+    return state.values
+
+
+def random_message(rng: random.Random) -> str:
+    words = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 6))]
+    # Fragments run together too ("firstmember 1"), and casing varies
+    text = "".join(w + rng.choice([" ", "", "  "]) for w in words)
+    return "".join(c.upper() if rng.random() < 0.2 else c for c in text)
+
+
+def random_conversation(rng: random.Random) -> list:
+    return [
+        {"sender": rng.choice(["user", "user", "ai"]), "message": random_message(rng)}
+        for _ in range(rng.randint(0, 40))
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_legacy_chain_on_random_conversations(seed):
+    rng = random.Random(seed)
+    for _ in range(100):
+        history = random_conversation(rng)
+        assert compiled_extract(history) == legacy_extract(history)
+
+
+def test_matches_legacy_chain_on_recorded_conversations():
+    with open(TRACES) as f:
+        traces = json.load(f)
+    for messages in traces:
+        history = [{"sender": "user", "message": m} for m in messages]
+        assert compiled_extract(history) == legacy_extract(history)
+
+
+def test_get_rebuilds_state_when_another_worker_saved_messages():
+    history = [{"sender": "user", "message": "I live in the state of Texas"}]
+    extractor = FormExtractor()
+
+    async def iter_history(session_id):
+        for msg in list(history):
+            yield msg
+
+    async def count(session_id):
+        return len(history)
+
+    async def scenario():
+        state = extractor.new("s", SNAP_MATCHER)
+        state.update("user", history[0]["message"])
+        # Saved through another process: this one never observed it
+        history.append({"sender": "user", "message": "My phone number is 555-0100"})
+        assert (await extractor.get("s", SNAP_MATCHER, iter_history)).values["phone"] == ""
+        state = await extractor.get("s", SNAP_MATCHER, iter_history, count)
+        assert state.values["phone"] == "My phone number is 555-0100"
+        assert state.values["state"] == "I live in the state of Texas"
+        assert await extractor.get("s", SNAP_MATCHER, iter_history, count) is state
+
+    asyncio.run(scenario())
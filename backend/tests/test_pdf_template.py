@@ -0,0 +1,60 @@
+import base64
+import os
+import re
+import zlib
+
+from form_packs import PACKS_DIR, load_pack
+from pdf_template import PageTemplate
+
+# The precompiled template reads reportlab internals (the canvas's content
+# stream and font mapping), so render real PDFs and check what they show.
+SNAP_TEMPLATE = load_pack(os.path.join(PACKS_DIR, "snap.yaml")).template
+
+
+def page_text(pdf: bytes) -> str:
+    """The page content streams of a reportlab PDF, decoded."""
+    streams = []
+    for match in re.finditer(rb"<<(.*?)>>\s*stream\r?\n(.*?)endstream", pdf, re.S):
+        header, data = match.groups()
+        if b"/ASCII85Decode" in header:
+            data = base64.a85decode(data.strip(), adobe=True)
+        if b"/FlateDecode" in header:
+            data = zlib.decompress(data)
+        streams.append(data.decode("latin-1"))
+    return "\n".join(streams)
+
+
+def shown_strings(pdf: bytes) -> list:
+    return [s.replace("\\(", "(").replace("\\)", ")") for s in re.findall(r"\(((?:\\.|[^\\)])*)\) Tj", page_text(pdf))]
+
+
+def test_render_shows_static_text_and_values():
+    layout = SNAP_TEMPLATE.layout
+    form_data = {"full_name": "Jane Doe", "state": "Texas", "language": "English", "rent": "$900 (monthly)"}
+    shown = shown_strings(PageTemplate(layout).render(form_data))
+
+    assert layout["title"] in shown
+    assert layout["footer"] in shown
+    for section in layout["sections"]:
+        assert section["title"] in shown
+        for field in section["fields"]:
+            assert field["label"] in shown
+    assert "Jane Doe" in shown
+    assert "Texas / English" in shown
+    assert "$900 (monthly)" in shown
+
+
+def test_fonts_used_by_static_text_are_declared():
+    pdf = PageTemplate(SNAP_TEMPLATE.layout).render({})
+    used = set(re.findall(r"/(F\d+) \d+ Tf", page_text(pdf)))
+    declared = set(re.findall(rb"/Name /(F\d+) /Subtype /Type1", pdf))
+    assert used and used <= {name.decode() for name in declared}
+
+
+def test_renders_reuse_the_compiled_page():
+    template = PageTemplate(SNAP_TEMPLATE.layout)
+    first = shown_strings(template.render({"full_name": "Jane Doe"}))
+    second = shown_strings(template.render({"full_name": "John Roe"}))
+    assert "Jane Doe" in first and "Jane Doe" not in second
+    assert "John Roe" in second
+    assert len(first) == len(second)
@@ -0,0 +1,141 @@
+import asyncio
+
+from persistence import WriteBehindQueue, is_permanent_error
+
+
+class APIError(Exception):
+    """Stands in for postgrest's APIError, which carries the PostgreSQL/HTTP code."""
+
+    def __init__(self, code):
+        super().__init__(f"error {code}")
+        self.code = code
+
+
+class FakeTable:
+    """Records committed rows; ``fail`` decides the error (if any) for a batch."""
+
+    def __init__(self, fail=lambda batch: None):
+        self.fail = fail
+        self.committed = []
+        self.calls = 0
+
+    async def insert(self, batch):
+        self.calls += 1
+        await asyncio.sleep(0)
+        error = self.fail(batch)
+        if error is not None:
+            raise error
+        self.committed.extend(row["message"] for row in batch)
+
+
+async def put_all(queue, messages, application_id="app"):
+    for message in messages:
+        await queue.put(application_id, "user", message)
+
+
+def test_error_classification():
+    assert is_permanent_error(APIError("22P02"))
+    assert is_permanent_error(APIError("23503"))
+    assert is_permanent_error(APIError(400))
+    assert is_permanent_error(APIError("PGRST204"))
+    assert not is_permanent_error(APIError("PGRST001"))
+    assert not is_permanent_error(APIError(429))
+    assert not is_permanent_error(APIError(503))
+    assert not is_permanent_error(APIError("40001"))
+    assert not is_permanent_error(ConnectionError("reset"))
+
+
+def test_permanent_error_drops_only_the_bad_row():
+    table = FakeTable(lambda batch: APIError("22P02") if any(row["message"] == "m5" for row in batch) else None)
+    messages = [f"m{i}" for i in range(12)]
+
+    async def scenario():
+        queue = WriteBehindQueue(table.insert, max_batch=100, flush_interval=60)
+        await put_all(queue, messages)
+        await queue.flush()
+        await queue.drain()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert table.committed == [m for m in messages if m != "m5"]
+    assert queue.dropped_rows == 1
+    assert queue.pending("app") == []
+    assert queue.stats()["queued"] == 0
+
+
+def test_transient_errors_are_retried_then_dropped():
+    failures = iter([ConnectionError("reset"), APIError(503)])
+    flaky = FakeTable(lambda batch: next(failures, None))
+    down = FakeTable(lambda batch: APIError(503))
+
+    async def scenario(table):
+        queue = WriteBehindQueue(table.insert, flush_interval=60, max_retries=2)
+        await put_all(queue, ["a", "b"])
+        await queue.flush()
+        await queue.drain()
+        return queue
+
+    queue = asyncio.run(scenario(flaky))
+    assert flaky.committed == ["a", "b"]
+    assert flaky.calls == 3
+    assert queue.dropped_rows == 0
+
+    queue = asyncio.run(scenario(down))
+    assert down.calls == 3
+    assert down.committed == []
+    assert queue.dropped_rows == 2
+    assert queue.pending("app") == []
+
+
+def test_cancelled_bisection_requeues_only_unwritten_rows():
+    messages = [f"m{i}" for i in range(8)]
+
+    async def scenario():
+        release = asyncio.Event()
+        reached = asyncio.Event()
+
+        async def insert(batch):
+            names = [row["message"] for row in batch]
+            if "m6" in names:
+                raise APIError("23503")
+            if names == ["m4", "m5"] and not release.is_set():
+                reached.set()
+                await release.wait()
+            table.committed.extend(names)
+
+        table = FakeTable()
+        queue = WriteBehindQueue(insert, max_batch=100, flush_interval=60)
+        await put_all(queue, messages)
+        flushing = asyncio.create_task(queue.flush())
+        await reached.wait()
+        # m0..m3 are committed; cancel while m4, m5 are being inserted
+        flushing.cancel()
+        await asyncio.gather(flushing, return_exceptions=True)
+        assert table.committed == ["m0", "m1", "m2", "m3"]
+        assert [row["message"] for row in queue.pending("app")] == ["m4", "m5", "m6", "m7"]
+        release.set()
+        await queue.drain()
+        return table, queue
+
+    table, queue = asyncio.run(scenario())
+    assert table.committed == ["m0", "m1", "m2", "m3", "m4", "m5", "m7"]
+    assert queue.dropped_rows == 1
+    assert queue.pending("app") == []
+
+
+def test_drain_writes_everything_still_buffered():
+    table = FakeTable()
+
+    async def scenario():
+        queue = WriteBehindQueue(table.insert, max_batch=3, flush_interval=60)
+        await put_all(queue, ["a", "b"], "app1")
+        await put_all(queue, ["c", "d", "e"], "app2")
+        await queue.drain()
+        # Once closed, a put writes through
+        await queue.put("app1", "ai", "f")
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert table.committed == ["a", "b", "c", "d", "e", "f"]
+    assert queue.stats()["queued"] == 0
+    assert queue.pending("app1") == queue.pending("app2") == []
@@ -0,0 +1,170 @@
+import asyncio
+import time
+
+import pytest
+
+from resilience import CircuitBreaker, DeadlineExceeded, Upstream, UpstreamUnavailable, is_upstream_fault, request_deadline
+
+
+class InvalidArgument(Exception):
+    code = 400
+
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+
+class HTTPError(Exception):
+    """Carries the status on a response object, like requests' and httpx's errors."""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.response = type("Response", (), {"status_code": status})()
+
+
+async def fail(error):
+    raise error
+
+
+async def sleep(seconds):
+    await asyncio.sleep(seconds)
+
+
+async def attempts(upstream, count, func, *args):
+    for _ in range(count):
+        try:
+            await upstream.call(func, *args)
+        except Exception:
+            pass
+
+
+def test_upstream_faults():
+    assert is_upstream_fault(asyncio.TimeoutError())
+    assert is_upstream_fault(ConnectionError())
+    assert is_upstream_fault(ServiceUnavailable())
+    assert is_upstream_fault(HTTPError(429))
+    assert not is_upstream_fault(InvalidArgument())
+    assert not is_upstream_fault(HTTPError(404))
+    assert not is_upstream_fault(DeadlineExceeded("deadline"))
+    assert not is_upstream_fault(ValueError())
+
+
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.05)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.opened == 1
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_client_errors_do_not_open_the_breaker():
+    upstream = Upstream("test", retries=0, breaker=CircuitBreaker(failure_threshold=3))
+    asyncio.run(attempts(upstream, 10, fail, InvalidArgument()))
+    assert upstream.breaker.state == "closed"
+    assert upstream.failed == 10
+
+    asyncio.run(attempts(upstream, 3, fail, ServiceUnavailable()))
+    assert upstream.breaker.state == "open"
+
+
+def test_provider_timeouts_open_the_breaker():
+    upstream = Upstream("test", timeout=0.01, retries=0, breaker=CircuitBreaker(failure_threshold=3))
+    asyncio.run(attempts(upstream, 3, sleep, 1))
+    assert upstream.breaker.state == "open"
+    assert upstream.timeouts == 3
+
+
+def test_deadline_timeouts_do_not_open_the_breaker():
+    upstream = Upstream("test", timeout=10, retries=2, breaker=CircuitBreaker(failure_threshold=3))
+
+    async def scenario():
+        for _ in range(5):
+            with request_deadline(0.01):
+                with pytest.raises(DeadlineExceeded):
+                    await upstream.call(sleep, 1)
+        # Spent before the call: not attempted at all
+        with request_deadline(0.001):
+            await asyncio.sleep(0.01)
+            with pytest.raises(UpstreamUnavailable):
+                await upstream.call(sleep, 0)
+
+    asyncio.run(scenario())
+    assert upstream.breaker.state == "closed"
+    assert upstream.breaker.failures == 0
+    assert upstream.retried == 0
+
+
+def test_timeouts_are_not_retried_unless_listed():
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(1)
+
+    upstream = Upstream("tts", timeout=0.01, retries=2, retry_on=(ConnectionError,))
+    asyncio.run(attempts(upstream, 1, slow))
+    assert len(calls) == 1
+
+    flaky = iter([ConnectionError(), None])
+
+    async def reconnect():
+        calls.append(1)
+        error = next(flaky)
+        if error:
+            raise error
+
+    calls.clear()
+    asyncio.run(upstream.call(reconnect))
+    assert len(calls) == 2
+
+
+def test_abandoned_stream_is_not_a_failure():
+    upstream = Upstream("test", breaker=CircuitBreaker(failure_threshold=1))
+
+    async def stream():
+        async with upstream.slot():
+            for i in range(10):
+                yield i
+
+    async def scenario():
+        chunks = stream()
+        assert await chunks.__anext__() == 0
+        # The client disconnected: the generator is closed mid-stream
+        await chunks.aclose()
+
+        task = asyncio.create_task(upstream.call(sleep, 1))
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert upstream.breaker.state == "closed"
+    assert upstream.failed == 0
+    assert upstream.in_flight == 0
+
+
+def test_failed_stream_is_recorded():
+    upstream = Upstream("test", breaker=CircuitBreaker(failure_threshold=1))
+
+    async def scenario():
+        with pytest.raises(ConnectionError):
+            async with upstream.slot():
+                raise ConnectionError("reset mid-stream")
+
+    asyncio.run(scenario())
+    assert upstream.breaker.state == "open"